@@ -0,0 +1,120 @@
+"""Matches page lookup benchmark.
+
+Compares loading the matched users' profiles one find_one per match (the old
+N+1 pattern) with a single batched $in query, for growing match counts. The
+in-memory stand-in adds a simulated round trip per query (--latency-ms) so
+the cost of extra round trips shows up without a database; --mongo-uri runs
+the same lookups against a real MongoDB (seeded into bench_users):
+
+    python -m benchmarks.bench_matches --match-counts 10 50 200 --latency-ms 5
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+from pymongo import MongoClient
+
+from config import Config
+from indexes import ensure_collection_indexes
+from matching import CARD_FIELDS, CandidateProfile
+
+from benchmarks.bench_matching import git_commit, percentile
+from benchmarks.memory_db import MemoryCollection
+from benchmarks.synthetic import generate_users
+
+
+def lookup_one_by_one(collection, matched_ids):
+    """Old matches page: one find_one per matched user"""
+    profiles = []
+    for user_id in matched_ids:
+        user_data = collection.find_one({'_id': user_id})
+        if user_data:
+            profiles.append(CandidateProfile(user_data))
+    return profiles
+
+
+def lookup_batched(collection, matched_ids):
+    """Current matches page: one $in query with a card projection"""
+    users_by_id = {
+        user_data['_id']: user_data
+        for user_data in collection.find({'_id': {'$in': matched_ids}}, CARD_FIELDS)
+    }
+    return [CandidateProfile(users_by_id[user_id]) for user_id in matched_ids if user_id in users_by_id]
+
+
+def measure(lookup, collection, matched_ids, samples):
+    """Latency percentiles of one lookup strategy"""
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        lookup(collection, matched_ids)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        'samples': samples,
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3)
+    }
+
+
+def run(match_counts, population, samples, latency_ms, seed, mongo_uri=None):
+    """Time both lookups for each match count, against one population"""
+    documents = generate_users(population, seed=seed)
+    if mongo_uri:
+        collection = MongoClient(mongo_uri).get_default_database().bench_users
+        collection.drop()
+        collection.insert_many(documents)
+        ensure_collection_indexes(collection, 'users')
+    else:
+        collection = MemoryCollection(documents, latency_ms=latency_ms)
+
+    per_page = Config.USERS_PER_PAGE
+    results = {}
+    for count in match_counts:
+        matched_ids = [document['_id'] for document in documents[:count]]
+        results[count] = {
+            'one_by_one': measure(lookup_one_by_one, collection, matched_ids, samples),
+            # The page only ever loads one page of matches at a time
+            'batched_page': measure(lookup_batched, collection, matched_ids[:per_page], samples),
+            'batched_all': measure(lookup_batched, collection, matched_ids, samples)
+        }
+        print(f"💞 {count} matches")
+        for name, metrics in results[count].items():
+            print(f"   {name:<14} p50 {metrics['p50_ms']:>10.2f} ms   p95 {metrics['p95_ms']:>10.2f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the matches page profile lookup')
+    parser.add_argument('--match-counts', type=int, nargs='+', default=[10, 50, 200], help='Matches per user to test')
+    parser.add_argument('--population', type=int, default=2000, help='Users in the synthetic campus')
+    parser.add_argument('--samples', type=int, default=10, help='Timed lookups per strategy')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Simulated round trip of the in-memory stand-in')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the population')
+    parser.add_argument('--mongo-uri', help='Benchmark against this MongoDB instead of the in-memory stand-in')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/matches-<commit>.json)')
+    args = parser.parse_args()
+
+    results = run(args.match_counts, args.population, args.samples, args.latency_ms, args.seed, args.mongo_uri)
+
+    commit = git_commit()
+    output = args.output or os.path.join('benchmarks', 'results', f"matches-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as output_file:
+        json.dump({
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'backend': 'mongodb' if args.mongo_uri else 'memory',
+            'latency_ms': None if args.mongo_uri else args.latency_ms,
+            'results': results
+        }, output_file, indent=2)
+    print(f"✅ Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
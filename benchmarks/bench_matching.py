@@ -0,0 +1,243 @@
+"""Matching benchmarks at campus scale.
+
+Generates a synthetic population per size, then measures each matching path
+for a sample of "current users": latency percentiles, throughput and peak
+memory. Runs against the in-memory stand-in by default, or against a local
+MongoDB with --mongo-uri (seeded into a separate bench_users collection).
+Results are written as JSON so runs can be compared across commits:
+
+    python -m benchmarks.bench_matching --sizes 1000 10000
+    python -m benchmarks.bench_matching --sizes 1000 --compare benchmarks/results/matching-abc1234.json
+"""
+import argparse
+import heapq
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+from config import Config
+from indexes import ensure_collection_indexes
+from matching import (SCORING_FIELDS, CandidateFeatures, CandidateProfile, calculate_compatibility, candidate_tiers,
+                      compatibility_pipeline, find_top_matches, ranking_key, score_candidates)
+
+from benchmarks.memory_db import MemoryCollection
+from benchmarks.synthetic import generate_users
+
+
+def dashboard_filter(user):
+    """Same candidate filter as the dashboard's gender-preference query"""
+    return {'_id': {'$ne': ObjectId(user.id)}, 'gender': user.interested_in, 'interested_in': user.gender}
+
+
+def suggestion_filter(user):
+    """Same candidate filter as the suggestions query for a user with no likes"""
+    return {'_id': {'$nin': [ObjectId(user.id)]}}
+
+
+def loop_top_matches(collection, user, base_filter, limit, min_score=0):
+    """Reference for find_top_matches: the same tier queries, scored in a plain loop and sorted at the end"""
+    ranked = []
+    scored_tiers = []
+    for tier_filter, upper_bound in candidate_tiers(user):
+        if upper_bound < min_score:
+            break
+        if len(ranked) >= limit and heapq.nlargest(limit, (p.compatibility_score for p in ranked))[-1] > upper_bound:
+            break
+        query = [base_filter] + ([tier_filter] if tier_filter else []) + ([{'$nor': scored_tiers}] if scored_tiers else [])
+        for user_data in collection.find({'$and': query}, SCORING_FIELDS):
+            profile = CandidateProfile(user_data)
+            profile.compatibility_score = calculate_compatibility(user, profile)
+            if profile.compatibility_score >= min_score:
+                ranked.append(profile)
+        if tier_filter:
+            scored_tiers.append(tier_filter)
+    return heapq.nlargest(limit, ranked, key=ranking_key)
+
+
+class CachedQueries:
+    """Collection wrapper answering repeated finds from memory, so timings leave out the query itself"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.results = {}
+
+    def find(self, query, projection=None):
+        key = repr((query, projection))
+        if key not in self.results:
+            self.results[key] = list(self.collection.find(query, projection))
+        return iter(self.results[key])
+
+
+# (path, reference path): ranking must not be slower than the loop it replaced
+REGRESSION_CHECKS = [('dashboard_ranking', 'dashboard_ranking_loop'), ('suggest_ranking', 'suggest_ranking_loop')]
+
+# Slack for timing noise when comparing p50 latencies
+REGRESSION_TOLERANCE = 1.25
+
+
+def matching_paths(collection, candidates, use_aggregation):
+    """Map each benchmarked path to a callable taking the current user"""
+    per_page = Config.USERS_PER_PAGE
+    limit = Config.RECOMMENDATIONS_LIMIT
+    features = CandidateFeatures(candidates)
+    cached = CachedQueries(collection)
+    paths = {
+        'calculate_compatibility': lambda user: [calculate_compatibility(user, candidate) for candidate in candidates],
+        'score_candidates': lambda user: score_candidates(user, candidates),
+        'score_candidates_prebuilt': lambda user: score_candidates(user, features),
+        'dashboard_page': lambda user: find_top_matches(collection, user, dashboard_filter(user), limit=per_page + 1),
+        'suggest_matches': lambda user: find_top_matches(collection, user, suggestion_filter(user), limit=5, min_score=30),
+        'dashboard_ranking': lambda user: find_top_matches(cached, user, dashboard_filter(user), limit=per_page + 1),
+        'dashboard_ranking_loop': lambda user: loop_top_matches(cached, user, dashboard_filter(user), per_page + 1),
+        'suggest_ranking': lambda user: find_top_matches(cached, user, suggestion_filter(user), limit=5, min_score=30),
+        'suggest_ranking_loop': lambda user: loop_top_matches(cached, user, suggestion_filter(user), 5, min_score=30),
+        'recommendations_rebuild': lambda user: (
+            find_top_matches(collection, user, dashboard_filter(user), limit=limit),
+            find_top_matches(collection, user, suggestion_filter(user), limit=limit, min_score=30)
+        ),
+    }
+    if use_aggregation:
+        paths['dashboard_page_aggregation'] = lambda user: list(
+            collection.aggregate(compatibility_pipeline(user, dashboard_filter(user), per_page + 1)))
+        paths['suggest_matches_aggregation'] = lambda user: list(
+            collection.aggregate(compatibility_pipeline(user, suggestion_filter(user), 5, min_score=30)))
+    return paths
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(path, users, population_size):
+    """Time a path for every sample user and record its peak memory once"""
+    latencies = []
+    for user in users:
+        started = time.perf_counter()
+        path(user)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    tracemalloc.start()
+    path(users[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_seconds = sum(latencies) / 1000
+    return {
+        'samples': len(latencies),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'calls_per_second': round(len(latencies) / total_seconds, 2),
+        'pairs_per_second': round(len(latencies) * (population_size - 1) / total_seconds, 1),
+        'peak_memory_kib': round(peak / 1024, 1)
+    }
+
+
+def run(sizes, samples, seed, mongo_uri=None):
+    """Benchmark every matching path for each population size"""
+    results = {}
+    for size in sizes:
+        documents = generate_users(size, seed=seed)
+        if mongo_uri:
+            collection = MongoClient(mongo_uri).get_default_database().bench_users
+            collection.drop()
+            collection.insert_many(documents)
+            ensure_collection_indexes(collection, 'users')
+        else:
+            collection = MemoryCollection(documents)
+
+        candidates = [CandidateProfile(document) for document in documents]
+        users = candidates[:samples]
+
+        print(f"👥 {size} users")
+        results[size] = {}
+        paths = matching_paths(collection, candidates, bool(mongo_uri))
+        # Fill the query cache first, so the ranking comparisons time scoring and ranking only
+        for user in users:
+            for _, reference in REGRESSION_CHECKS:
+                paths[reference](user)
+        for name, path in paths.items():
+            results[size][name] = metrics = measure(path, users, size)
+            print(f"   {name:<28} p50 {metrics['p50_ms']:>10.2f} ms   p95 {metrics['p95_ms']:>10.2f} ms   "
+                  f"{metrics['pairs_per_second']:>14,.0f} pairs/s   {metrics['peak_memory_kib']:>10,.0f} KiB")
+    return results
+
+
+def check_regressions(results):
+    """Report request paths slower than the reference loops, returning them"""
+    slower = []
+    for size, paths in results.items():
+        for name, reference in REGRESSION_CHECKS:
+            if paths[name]['p50_ms'] > paths[reference]['p50_ms'] * REGRESSION_TOLERANCE:
+                slower.append((size, name))
+                print(f"❌ {size:>7} {name} p50 {paths[name]['p50_ms']:.2f} ms is slower than "
+                      f"{reference} p50 {paths[reference]['p50_ms']:.2f} ms")
+    return slower
+
+
+def git_commit():
+    """Short hash of the checked-out commit, if available"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print the p50 change of every path against an earlier results file"""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    print(f"\n📊 Compared with {baseline.get('commit')} ({baseline_path})")
+    for size, paths in results.items():
+        for name, metrics in paths.items():
+            previous = baseline['results'].get(str(size), {}).get(name)
+            if previous:
+                change = (metrics['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100
+                print(f"   {size:>7} {name:<28} p50 {previous['p50_ms']:>10.2f} -> {metrics['p50_ms']:>10.2f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the matching paths on synthetic campuses')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='Population sizes to test')
+    parser.add_argument('--samples', type=int, default=20, help='Current users timed per path')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the population')
+    parser.add_argument('--mongo-uri', help='Benchmark against this MongoDB instead of the in-memory stand-in')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/matching-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.samples, args.seed, args.mongo_uri)
+
+    commit = git_commit()
+    output = args.output or os.path.join('benchmarks', 'results', f"matching-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as output_file:
+        json.dump({
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'backend': 'mongodb' if args.mongo_uri else 'memory',
+            'seed': args.seed,
+            'results': results
+        }, output_file, indent=2)
+    print(f"✅ Results saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    if check_regressions(results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
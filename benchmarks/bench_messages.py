@@ -0,0 +1,122 @@
+"""Chat history query benchmark: sender/receiver $or versus conversation_id.
+
+Seeds a bench_messages collection in a MongoDB with conversations of growing
+length, indexed both ways, then times loading one conversation with the old
+two-branch $or on sender_id/receiver_id and with a single conversation_id
+range scan, and reports the keys and documents each plan examines:
+
+    python -m benchmarks.bench_messages --mongo-uri mongodb://localhost:27017/bench
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING, MongoClient
+
+from matching import match_pair_id
+
+from benchmarks.bench_matching import git_commit, percentile
+
+
+def seed(collection, lengths, conversations_per_length, seed):
+    """Insert conversations of each length, returning one (user, other) pair per length"""
+    rng = random.Random(seed)
+    collection.drop()
+    started = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    samples = {}
+    for length in lengths:
+        for _ in range(conversations_per_length):
+            user_a, user_b = ObjectId(), ObjectId()
+            samples.setdefault(length, (user_a, user_b))
+            messages = []
+            for index in range(length):
+                sender, receiver = (user_a, user_b) if rng.random() < 0.5 else (user_b, user_a)
+                messages.append({
+                    'conversation_id': match_pair_id(user_a, user_b),
+                    'sender_id': sender,
+                    'receiver_id': receiver,
+                    'content': 'x' * rng.randint(5, 120),
+                    'timestamp': started + timedelta(seconds=index * 30),
+                    'is_read': True
+                })
+            collection.insert_many(messages)
+    collection.create_index([('sender_id', ASCENDING), ('receiver_id', ASCENDING), ('timestamp', ASCENDING)])
+    collection.create_index([('conversation_id', ASCENDING), ('timestamp', ASCENDING), ('_id', ASCENDING)])
+    return samples
+
+
+def by_participants(collection, user_a, user_b):
+    """Old chat history query: one branch per direction"""
+    return collection.find({'$or': [
+        {'sender_id': user_a, 'receiver_id': user_b},
+        {'sender_id': user_b, 'receiver_id': user_a}
+    ]}).sort('timestamp', 1)
+
+
+def by_conversation(collection, user_a, user_b):
+    """Current chat history query: one range on the conversation index"""
+    return collection.find({'conversation_id': match_pair_id(user_a, user_b)}).sort([('timestamp', 1), ('_id', 1)])
+
+
+def measure(query, collection, user_a, user_b, samples):
+    """Latency percentiles plus what the winning plan examined"""
+    latencies = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        list(query(collection, user_a, user_b))
+        latencies.append((time.perf_counter() - started) * 1000)
+    stats = query(collection, user_a, user_b).explain()['executionStats']
+    return {
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'keys_examined': stats['totalKeysExamined'],
+        'docs_examined': stats['totalDocsExamined']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark chat history queries on MongoDB')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017/bench', help='MongoDB to seed and query')
+    parser.add_argument('--lengths', type=int, nargs='+', default=[50, 500, 5000], help='Messages per conversation')
+    parser.add_argument('--conversations', type=int, default=20, help='Conversations seeded per length')
+    parser.add_argument('--samples', type=int, default=20, help='Timed loads per query')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--output', help='Results file (default: benchmarks/results/messages-<commit>.json)')
+    args = parser.parse_args()
+
+    collection = MongoClient(args.mongo_uri).get_default_database().bench_messages
+    pairs = seed(collection, args.lengths, args.conversations, args.seed)
+
+    results = {}
+    for length, (user_a, user_b) in pairs.items():
+        results[length] = {
+            'by_participants': measure(by_participants, collection, user_a, user_b, args.samples),
+            'by_conversation': measure(by_conversation, collection, user_a, user_b, args.samples)
+        }
+        print(f"💬 {length} messages")
+        for name, metrics in results[length].items():
+            print(f"   {name:<16} p50 {metrics['p50_ms']:>9.2f} ms   p95 {metrics['p95_ms']:>9.2f} ms   "
+                  f"keys {metrics['keys_examined']:>6}   docs {metrics['docs_examined']:>6}")
+
+    commit = git_commit()
+    output = args.output or os.path.join('benchmarks', 'results', f"messages-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as output_file:
+        json.dump({
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'results': results
+        }, output_file, indent=2)
+    print(f"✅ Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""In-memory stand-in for the MongoDB collections used by the matching paths.
+
+Supports the subset of the query language the app's candidate queries use:
+equality, $ne, $in, $nin, $exists, $gt/$gte/$lt/$lte, $and, $or and $nor,
+with array fields matching if any element matches.
+"""
+import time
+
+
+def _matches_operator(value, present, operator, argument):
+    """Evaluate one query operator against a document value"""
+    values = value if isinstance(value, list) else [value]
+    if operator == '$in':
+        return any(item in argument for item in values)
+    if operator == '$nin':
+        return not any(item in argument for item in values)
+    if operator == '$ne':
+        return all(item != argument for item in values)
+    if operator == '$exists':
+        return present == bool(argument)
+    comparable = [item for item in values if item is not None and type(item) == type(argument)]
+    if operator == '$gt':
+        return any(item > argument for item in comparable)
+    if operator == '$gte':
+        return any(item >= argument for item in comparable)
+    if operator == '$lt':
+        return any(item < argument for item in comparable)
+    if operator == '$lte':
+        return any(item <= argument for item in comparable)
+    raise NotImplementedError(f'{operator} is not supported by the in-memory stand-in')
+
+
+def matches(document, query):
+    """Check whether a document matches a MongoDB query"""
+    for key, condition in query.items():
+        if key == '$and':
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == '$or':
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == '$nor':
+            if any(matches(document, clause) for clause in condition):
+                return False
+        else:
+            value = document.get(key)
+            present = key in document
+            if isinstance(condition, dict) and condition and all(op.startswith('$') for op in condition):
+                if not all(_matches_operator(value, present, op, arg) for op, arg in condition.items()):
+                    return False
+            elif isinstance(value, list):
+                if condition not in value and condition != value:
+                    return False
+            elif value != condition:
+                return False
+    return True
+
+
+class MemoryCollection:
+    """A list of documents answering find() like a pymongo collection.
+
+    ``latency_ms`` adds a simulated network round trip to every query, so
+    access patterns that cost many round trips show up in timings.
+    """
+
+    def __init__(self, documents=(), latency_ms=0):
+        self.documents = list(documents)
+        self.latency_ms = latency_ms
+
+    def insert_many(self, documents):
+        self.documents.extend(documents)
+
+    def _round_trip(self):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    def find_one(self, query=None, projection=None):
+        """Return the first matching document, or None"""
+        results = self.find(query, projection)
+        return results[0] if results else None
+
+    def find(self, query=None, projection=None):
+        """Return matching documents, keeping only projected fields when given"""
+        self._round_trip()
+        results = [document for document in self.documents if matches(document, query or {})]
+        if projection:
+            fields = set(projection) | {'_id'}
+            results = [{key: value for key, value in document.items() if key in fields} for document in results]
+        return results
@@ -0,0 +1,129 @@
+"""Synthetic campus population generator for the matching benchmarks"""
+import random
+
+from bson import ObjectId
+
+from matching import bio_signature, normalize_tag
+
+# Rough share of students per course on an engineering campus
+COURSES = {
+    '(B.Tech)': 45, '(B.S)': 15, '(M.Tech)': 12, '(M.Sc)': 8,
+    '(MBA)': 6, '(Ph.D)': 8, 'Humanities': 4, 'OTHERs': 2
+}
+
+# Years on offer per course, weighted towards junior years
+COURSE_YEARS = {
+    '(B.Tech)': [1, 2, 3, 4], '(B.S)': [1, 2, 3, 4], '(M.Tech)': [1, 2], '(M.Sc)': [1, 2],
+    '(MBA)': [1, 2], '(Ph.D)': [1, 2, 3, 4, 5], 'Humanities': [1, 2, 3], 'OTHERs': [1, 2, 3, 4]
+}
+
+PERSONALITIES = {
+    '': 20, 'Introvert': 18, 'Extrovert': 16, 'Analytical': 16,
+    'Creative': 14, 'Adventurous': 9, 'Cautious': 7
+}
+
+LOCATIONS = ['', 'Ganga Hostel', 'Jamuna Hostel', 'Krishna Hostel', 'Sarayu Hostel',
+             'Tapti Hostel', 'Godavari Hostel', 'Off Campus', 'Sharavati Hostel']
+
+INTERESTS = [
+    'Music', 'Movies', 'Coding', 'Cricket', 'Football', 'Reading', 'Travel', 'Photography',
+    'Gaming', 'Dance', 'Cooking', 'Hiking', 'Art', 'Chess', 'Badminton', 'Anime', 'Poetry',
+    'Startups', 'Robotics', 'Quizzing', 'Yoga', 'Gym', 'Singing', 'Guitar', 'Debate',
+    'Astronomy', 'Cycling', 'Swimming', 'Theatre', 'Volunteering', 'Blogging', 'Fashion'
+]
+
+STUDY_HABITS = [
+    'Night owl', 'Early bird', 'Group study', 'Solo study', 'Library', 'Music while studying',
+    'Pomodoro', 'Last minute', 'Planner', 'Flashcards', 'Cafe study', 'Notes by hand'
+]
+
+LIFE_GOALS = [
+    'Startup founder', 'Research career', 'Higher studies abroad', 'Civil services', 'Travel the world',
+    'Financial independence', 'Social impact', 'Settle in hometown', 'Big tech job', 'Teaching',
+    'Start a family', 'Write a book'
+]
+
+BIO_WORDS = (
+    'i love to the and a of in with my on for coding music movies late night chai campus '
+    'friends weekend trips books football cricket hostel mess food long walks coffee photography '
+    'research startups dance sunsets hiking travel quiz gaming anime guitar cooking beach mountains '
+    'chill ambitious curious introvert extrovert adventurous creative analytical fest club'
+).split()
+
+
+def _weighted(rng, weights):
+    """Pick a key from a {value: weight} mapping"""
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _popular_sample(rng, pool, count):
+    """Sample distinct tags where earlier (more popular) tags are picked more often"""
+    weights = [1.0 / (rank + 1) for rank in range(len(pool))]
+    picked = []
+    while len(picked) < min(count, len(pool)):
+        tag = rng.choices(pool, weights=weights)[0]
+        if tag not in picked:
+            picked.append(tag)
+    return picked
+
+
+class TagVocabulary:
+    """In-memory stand-in for the tag_vocabulary collection"""
+
+    def __init__(self):
+        self.ids = {}
+
+    def intern(self, tags):
+        """Map tags to sorted integer IDs like intern_tags in main.py"""
+        return sorted(set(self.ids.setdefault(normalize_tag(tag), len(self.ids)) for tag in tags))
+
+
+def generate_users(count, seed=42, vocabulary=None):
+    """Generate ``count`` user documents shaped like those saved by the app"""
+    rng = random.Random(seed)
+    vocabulary = vocabulary or TagVocabulary()
+    users = []
+    for index in range(count):
+        course = _weighted(rng, COURSES)
+        gender = rng.choices(['Male', 'Female', 'Other'], weights=[55, 42, 3])[0]
+        interested_in = rng.choices(
+            ['Female', 'Male', 'Other'] if gender == 'Male' else ['Male', 'Female', 'Other'],
+            weights=[85, 10, 5]
+        )[0]
+
+        # Roughly a third of profiles are left mostly empty after registration
+        complete = rng.random() > 0.3
+        interests = _popular_sample(rng, INTERESTS, rng.randint(2, 8)) if complete else []
+        study_habits = _popular_sample(rng, STUDY_HABITS, rng.randint(1, 3)) if complete else []
+        life_goals = _popular_sample(rng, LIFE_GOALS, rng.randint(1, 3)) if complete else []
+        bio = ' '.join(rng.choices(BIO_WORDS, k=rng.randint(8, 40))) if complete and rng.random() > 0.2 else ''
+
+        users.append({
+            '_id': ObjectId(),
+            'username': f'student{index}',
+            'email': f'student{index}@example.edu',
+            'password_hash': 'pbkdf2:sha256:600000$bench$' + '0' * 64,
+            'first_name': f'Student{index}',
+            'last_name': 'Bench',
+            'age': rng.randint(17, 30),
+            'gender': gender,
+            'interested_in': interested_in,
+            'institute': 'IIT Madras',
+            'course': course,
+            'year': rng.choice(COURSE_YEARS[course]),
+            'bio': bio,
+            'profile_picture': '',
+            'location': rng.choice(LOCATIONS),
+            'building_block': '',
+            'interests': interests,
+            'study_habits': study_habits,
+            'life_goals': life_goals,
+            'personality_type': _weighted(rng, PERSONALITIES),
+            'interest_ids': vocabulary.intern(interests),
+            'habit_ids': vocabulary.intern(study_habits),
+            'goal_ids': vocabulary.intern(life_goals),
+            'bio_signature': bio_signature(bio),
+            'compatibility_score': 0,
+            'is_verified': True
+        })
+    return users
@@ -15,14 +15,54 @@ class Config:
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
+    # Parent domain shared with the realtime gateway when it runs on a subdomain, e.g. .example.edu
+    # (the default sends the session cookie to the app's own host only)
+    SESSION_COOKIE_DOMAIN = os.environ.get('SESSION_COOKIE_DOMAIN') or None
     
     # Application Configuration
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB
     UPLOAD_FOLDER = 'uploads'
     
+    # Create missing MongoDB indexes in the background when the app starts
+    ENSURE_INDEXES_ON_STARTUP = os.environ.get('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true'
+    
     # Pagination
     USERS_PER_PAGE = 10
     MESSAGES_PER_PAGE = 50
+    # Message polls re-read this far before their cursor: concurrent sends can commit out of
+    # timestamp order, and the chat page skips messages it already shows
+    MESSAGE_POLL_LOOKBACK = timedelta(seconds=5)
+    MESSAGE_PREVIEW_LENGTH = 100  # characters of the last message shown on the matches page
+    
+    # In-process cache of confirmed mutual matches used by the chat endpoints. Ended matches are
+    # dropped from every worker through the realtime broker ('mongodb' backend); the TTL bounds
+    # how long one stays cached if that event is missed. Counters are reported by /health
+    MATCH_CACHE_SIZE = 10000
+    MATCH_CACHE_TTL = 300  # seconds
+    
+    # Most like/skip decisions accepted by one /swipe_batch request
+    SWIPE_BATCH_LIMIT = 50
+    
+    # Realtime chat: 'memory' serves one worker process, 'mongodb' shares events
+    # between workers through a capped collection
+    REALTIME_BACKEND = os.environ.get('REALTIME_BACKEND') or 'memory'
+    REALTIME_CAPPED_SIZE = 8 * 1024 * 1024  # bytes
+    REALTIME_STREAM_SECONDS = 55  # Chat streams reconnect after this long
+    # Open chat streams per worker process; each holds a gunicorn thread, so keep this well
+    # below --threads. Chat pages beyond it fall back to polling (0 turns streams off)
+    REALTIME_MAX_STREAMS = int(os.environ.get('REALTIME_MAX_STREAMS') or 4)
+    # WebSocket gateway (gateway.py) used by the chat page when set, e.g. wss://chat.example.edu
+    # (on another host, also set SESSION_COOKIE_DOMAIN so the gateway receives the session cookie)
+    REALTIME_GATEWAY_URL = os.environ.get('REALTIME_GATEWAY_URL') or ''
+    
+    # Recommendations
+    RECOMMENDATIONS_LIMIT = 100  # Ranked candidates stored per user
+    MATCH_JOB_INTERVAL = timedelta(hours=24)  # How often match_job.py is scheduled to run
+    # Rebuild stored rankings after this long; it outlives the job interval (plus time for a run) so
+    # job-written lists are not rebuilt on the request path before the next run replaces them
+    RECOMMENDATIONS_TTL = MATCH_JOB_INTERVAL + timedelta(hours=2)
+    # 'python' scores candidates in the app, 'aggregation' scores them inside MongoDB
+    COMPATIBILITY_SCORING = os.environ.get('COMPATIBILITY_SCORING') or 'python'
     
     # Email Configurations for different purposes
     # OTP and Account Verification Emails
@@ -0,0 +1,205 @@
+"""Asyncio WebSocket gateway for realtime chat, typing and presence.
+
+Runs next to the synchronous Flask app, so long-lived sockets never hold up
+a gunicorn worker:
+
+    python gateway.py --port 8765 --origin https://dating.example.edu
+
+Browsers connect with the session cookie the app set at login, so the
+gateway shares its authentication; requests without a valid one are refused
+with 401 during the handshake. When the gateway runs on its own subdomain
+(REALTIME_GATEWAY_URL=wss://chat.example.edu), set SESSION_COOKIE_DOMAIN to
+the shared parent domain (e.g. .example.edu) so browsers send the cookie
+there too.
+
+send_message() still writes messages to MongoDB and publishes them on the
+realtime broker; the gateway listens to the broker and delivers each message
+to the sockets of both users. Use
+REALTIME_BACKEND=mongodb when the app and the gateway run as separate
+processes; the memory backend only carries events published inside the
+gateway process, which is enough for local testing. Typing and presence
+events go straight between connected matches.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import threading
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+
+from bson import ObjectId
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+from itsdangerous import BadSignature
+from pymongo import MongoClient
+from websockets.asyncio.server import broadcast, serve
+
+from cache import TTLCache
+from config import config
+from matching import match_pair_id
+from realtime import create_broker
+
+
+class SessionReader:
+    """Reads the logged-in user ID from the Flask session cookie"""
+
+    def __init__(self, app_config):
+        app = Flask(__name__)
+        app.config.from_object(app_config)
+        self.cookie_name = app.config['SESSION_COOKIE_NAME']
+        self.max_age = int(app.permanent_session_lifetime.total_seconds())
+        self.serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+
+    def user_id(self, cookie_header):
+        cookie = SimpleCookie()
+        cookie.load(cookie_header or '')
+        if self.cookie_name not in cookie:
+            return None
+        try:
+            session = self.serializer.loads(cookie[self.cookie_name].value, max_age=self.max_age)
+        except BadSignature:
+            return None
+        # Set by Flask-Login's login_user()
+        return session.get('_user_id')
+
+
+class MongoMatchStore:
+    """Match lookups for the gateway (blocking; run them in a thread)"""
+
+    def __init__(self, db):
+        self.db = db
+        self.cache = TTLCache()
+
+    def is_match(self, user_a, user_b):
+        pair_id = match_pair_id(user_a, user_b)
+        if self.cache.get(pair_id):
+            return True
+        matched = self.db.matches.find_one({'_id': pair_id}, {'_id': 1}) is not None
+        if matched:
+            self.cache.set(pair_id, True)
+        return matched
+
+    def forget(self, pair_ids):
+        """Drop ended matches, as published by the app on the 'match-cache' channel"""
+        self.cache.invalidate(*pair_ids)
+
+    def matched_users(self, user_id):
+        return [
+            str(other_id)
+            for match in self.db.matches.find({'users': ObjectId(user_id)}, {'users': 1})
+            for other_id in match['users'] if str(other_id) != user_id
+        ]
+
+
+class Gateway:
+    """Tracks open sockets per user and routes events between them"""
+
+    def __init__(self, sessions, matches):
+        self.sessions = sessions
+        self.matches = matches
+        self.sockets = {}  # user ID -> set of open connections
+
+    def authenticate(self, connection, request):
+        """Refuse the handshake with 401 unless the request carries a valid session cookie"""
+        if not self.sessions.user_id(request.headers.get('Cookie')):
+            return connection.respond(HTTPStatus.UNAUTHORIZED, 'Not logged in\n')
+        return None
+
+    async def handle(self, websocket):
+        # authenticate() already let only logged-in users through
+        user_id = self.sessions.user_id(websocket.request.headers.get('Cookie'))
+        first_socket = user_id not in self.sockets
+        self.sockets.setdefault(user_id, set()).add(websocket)
+        try:
+            matched = await asyncio.to_thread(self.matches.matched_users, user_id)
+            await websocket.send(json.dumps({
+                'type': 'presence',
+                'online': [other_id for other_id in matched if other_id in self.sockets]
+            }))
+            if first_socket:
+                self.send_to(matched, {'type': 'presence', 'user_id': user_id, 'online': True})
+
+            async for raw in websocket:
+                await self.receive(user_id, websocket, raw)
+        finally:
+            self.sockets[user_id].discard(websocket)
+            if not self.sockets[user_id]:
+                del self.sockets[user_id]
+                matched = await asyncio.to_thread(self.matches.matched_users, user_id)
+                self.send_to(matched, {'type': 'presence', 'user_id': user_id, 'online': False})
+
+    async def receive(self, user_id, websocket, raw):
+        """Handle one client event: typing notices and pings"""
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            return
+        if not isinstance(event, dict):
+            return
+        if event.get('type') == 'typing':
+            other_id = str(event.get('to', ''))
+            if other_id in self.sockets and await asyncio.to_thread(self.matches.is_match, user_id, other_id):
+                self.send_to([other_id], {'type': 'typing', 'user_id': user_id})
+        elif event.get('type') == 'ping':
+            await websocket.send(json.dumps({'type': 'pong'}))
+
+    def send_to(self, user_ids, event):
+        """Send an event to every open socket of the given users without waiting"""
+        connections = [websocket for user_id in user_ids for websocket in self.sockets.get(user_id, ())]
+        if connections:
+            broadcast(connections, json.dumps(event))
+
+    def dispatch(self, channel, event):
+        """Deliver an event published on the realtime broker"""
+        if channel.startswith('user:'):
+            self.send_to([channel[len('user:'):]], dict(event, type='message'))
+        elif channel == 'match-cache':
+            self.matches.forget(event['pair_ids'])
+
+
+def bridge(broker, gateway, loop, stop):
+    """Forward broker events into the gateway's event loop (runs in a thread)"""
+    # One subscription for the gateway's lifetime, so no event falls between two of them
+    for item in broker.listen_all(math.inf, heartbeat=1):
+        if stop.is_set():
+            break
+        if item is not None:
+            loop.call_soon_threadsafe(gateway.dispatch, *item)
+
+
+async def run_gateway(gateway, broker, host, port, origins=None):
+    """Serve WebSockets until cancelled"""
+    stop = threading.Event()
+    thread = threading.Thread(target=bridge, args=(broker, gateway, asyncio.get_running_loop(), stop),
+                              name='gateway-bridge', daemon=True)
+    thread.start()
+    try:
+        async with serve(gateway.handle, host, port, origins=origins, process_request=gateway.authenticate):
+            print(f"✅ Realtime gateway listening on ws://{host}:{port}")
+            await asyncio.Future()
+    finally:
+        stop.set()
+
+
+def main():
+    app_config = config[os.environ.get('FLASK_ENV', 'default')]
+    parser = argparse.ArgumentParser(description='Run the realtime WebSocket gateway')
+    parser.add_argument('--host', default='0.0.0.0', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--origin', action='append', required=True,
+                        help='Allowed page origin, e.g. https://dating.example.edu (repeat for several)')
+    parser.add_argument('--mongo-uri', default=app_config.MONGO_URI, help='MongoDB connection string')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri).get_default_database()
+    if app_config.REALTIME_BACKEND == 'memory':
+        print("⚠️  REALTIME_BACKEND is 'memory': only events published in this process are delivered")
+    broker = create_broker(app_config.REALTIME_BACKEND, db, app_config.REALTIME_CAPPED_SIZE)
+    gateway = Gateway(SessionReader(app_config), MongoMatchStore(db))
+    asyncio.run(run_gateway(gateway, broker, args.host, args.port, args.origin))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""MongoDB indexes for every collection the app queries.
+
+INDEXES declares the indexes each route's queries rely on. They are created
+at deploy time, and in a background thread when the app starts so a slow
+build never blocks startup. Indexes listed in OBSOLETE_INDEXES were replaced
+by newer ones and are dropped at the same time. The advisor runs explain() on each route's query
+shapes and flags any that fall back to a collection scan:
+
+    python indexes.py
+    python indexes.py --advise
+"""
+import argparse
+import os
+import threading
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.errors import OperationFailure
+
+from config import config
+from matching import SCORING_FIELDS, CandidateProfile, candidate_tiers, match_pair_id
+
+# Collection -> [(keys, options)]
+INDEXES = {
+    'users': [
+        ([('username', ASCENDING)], {'unique': True}),  # login, registration
+        ([('email', ASCENDING)], {'unique': True}),  # registration, password and username recovery
+        ([('gender', ASCENDING), ('interested_in', ASCENDING)], {}),  # dashboard candidate filter
+        ([('interest_ids', ASCENDING)], {}),  # candidate tier 1: shared tags
+        ([('habit_ids', ASCENDING)], {}),
+        ([('goal_ids', ASCENDING)], {}),
+        ([('location', ASCENDING)], {}),
+        ([('course', ASCENDING)], {}),  # candidate tier 2: similar course or year
+        ([('year', ASCENDING)], {}),
+        ([('institute', ASCENDING)], {}),  # offline matching job
+    ],
+    'likes': [
+        ([('liker_id', ASCENDING), ('liked_id', ASCENDING)], {'unique': True}),  # like checks, suggestions
+        ([('liked_id', ASCENDING)], {}),  # profile deletion
+    ],
+    'matches': [
+        ([('users', ASCENDING), ('last_activity', DESCENDING)], {}),  # matches page (inbox)
+    ],
+    'messages': [
+        ([('conversation_id', ASCENDING), ('timestamp', ASCENDING), ('_id', ASCENDING)], {}),  # chat history
+        ([('sender_id', ASCENDING)], {}),  # profile deletion
+        ([('receiver_id', ASCENDING)], {}),
+    ],
+    'notifications': [
+        ([('receiver_id', ASCENDING), ('timestamp', DESCENDING)], {}),  # notification list
+        ([('receiver_id', ASCENDING), ('is_read', ASCENDING)], {}),  # unread count, mark all read
+        ([('liker_id', ASCENDING)], {}),  # profile deletion
+    ],
+    'recommendations': [
+        ([('dashboard.user_id', ASCENDING)], {}),  # patching and removing a ranked user
+        ([('suggestions.user_id', ASCENDING)], {}),
+        # Fresh lists whose dashboard pool can hold an edited profile
+        ([('gender', ASCENDING), ('interested_in', ASCENDING), ('computed_at', ASCENDING)], {}),
+        ([('dashboard_fallback', ASCENDING), ('computed_at', ASCENDING)], {}),
+    ],
+    'match_jobs': [
+        ([('institute', ASCENDING), ('finished_at', ASCENDING), ('started_at', DESCENDING)], {}),  # job resume
+    ],
+}
+
+# Collection -> [keys] of indexes replaced by the ones above, dropped by ensure_indexes
+OBSOLETE_INDEXES = {
+    'matches': [
+        # Replaced by users/last_activity; run flask backfill-inbox before deploying
+        [('users', ASCENDING), ('created_at', DESCENDING)],
+    ],
+    'messages': [
+        # Replaced by conversation_id/timestamp/_id; run flask backfill-conversation-ids before deploying
+        [('sender_id', ASCENDING), ('receiver_id', ASCENDING), ('timestamp', ASCENDING)],
+    ],
+}
+
+
+def index_name(keys):
+    """Default name MongoDB gives an index over these keys"""
+    return '_'.join(f'{field}_{direction}' for field, direction in keys)
+
+
+def ensure_collection_indexes(collection, name=None):
+    """Create the declared indexes of one collection, returning their names"""
+    created = []
+    for keys, options in INDEXES[name or collection.name]:
+        try:
+            created.append(collection.create_index(keys, **options))
+        except OperationFailure as e:
+            # e.g. a unique index over existing duplicates; keep building the rest
+            print(f"⚠️  Could not create index {keys} on {collection.name}: {e}")
+    return created
+
+
+def drop_obsolete_indexes(collection, name=None):
+    """Drop the replaced indexes one collection still has, returning their names"""
+    existing = collection.index_information()
+    dropped = []
+    for keys in OBSOLETE_INDEXES.get(name or collection.name, []):
+        if index_name(keys) not in existing:
+            continue
+        try:
+            collection.drop_index(index_name(keys))
+            dropped.append(index_name(keys))
+        except OperationFailure as e:
+            print(f"⚠️  Could not drop index {keys} on {collection.name}: {e}")
+    return dropped
+
+
+def ensure_indexes(db):
+    """Create every declared index and drop the ones they replaced (a no-op once done)"""
+    created = []
+    dropped = []
+    for name in INDEXES:
+        created.extend(ensure_collection_indexes(db[name]))
+        dropped.extend(drop_obsolete_indexes(db[name]))
+    print(f"✅ Ensured {len(created)} indexes, dropped {len(dropped)} obsolete ones")
+    return created
+
+
+def ensure_indexes_in_background(db):
+    """Build indexes in a daemon thread so app startup does not wait on them"""
+    def build():
+        try:
+            ensure_indexes(db)
+        except Exception as e:
+            print(f"❌ Index bootstrap failed: {e}")
+
+    thread = threading.Thread(target=build, name='ensure-indexes', daemon=True)
+    thread.start()
+    return thread
+
+
+def query_shapes(db):
+    """Representative queries of each route as (route, collection, filter, sort)"""
+    user_data = db.users.find_one({}, SCORING_FIELDS) or {'_id': ObjectId(), 'year': 1}
+    user = CandidateProfile(user_data)
+    user_id = user_data['_id']
+    other_id = ObjectId()
+
+    dashboard_filter = {'_id': {'$ne': user_id}, 'gender': user.interested_in, 'interested_in': user.gender}
+    shapes = [
+        ('login', 'users', {'username': 'student'}, None),
+        ('register', 'users', {'email': 'student@example.edu'}, None),
+        ('like_user', 'likes', {'liker_id': user_id, 'liked_id': other_id}, None),
+        ('suggest_matches', 'likes', {'liker_id': user_id}, None),
+        ('matches', 'matches', {'users': user_id}, [('last_activity', DESCENDING), ('_id', DESCENDING)]),
+        ('chat', 'messages', {'conversation_id': match_pair_id(user_id, other_id)},
+         [('timestamp', ASCENDING), ('_id', ASCENDING)]),
+        ('mark_messages_read', 'messages', {'conversation_id': match_pair_id(user_id, other_id),
+                                            'receiver_id': user_id, 'is_read': False}, None),
+        ('get_notifications', 'notifications', {'receiver_id': user_id}, [('timestamp', DESCENDING)]),
+        ('unread_notifications', 'notifications', {'receiver_id': user_id, 'is_read': False}, None),
+        ('edit_profile', 'recommendations', {'$or': [
+            {'dashboard.user_id': user_id}, {'suggestions.user_id': user_id}
+        ]}, None),
+        ('edit_profile', 'recommendations', {'computed_at': {'$gte': datetime.now(timezone.utc)}, '$or': [
+            {'dashboard_fallback': True}, {'gender': user.interested_in, 'interested_in': user.gender}
+        ]}, None),
+        ('delete_profile', 'likes', {'$or': [{'liker_id': user_id}, {'liked_id': user_id}]}, None),
+        ('delete_profile', 'messages', {'$or': [{'sender_id': user_id}, {'receiver_id': user_id}]}, None),
+        ('delete_profile', 'notifications', {'liker_id': user_id}, None),
+    ]
+
+    # Dashboard candidate tiers, as find_top_matches queries them
+    scored_tiers = []
+    for number, (tier_filter, _) in enumerate(candidate_tiers(user), start=1):
+        query = [dashboard_filter]
+        if tier_filter:
+            query.append(tier_filter)
+        if scored_tiers:
+            query.append({'$nor': scored_tiers})
+        shapes.append((f'dashboard tier {number}', 'users', {'$and': query}, None))
+        if tier_filter:
+            scored_tiers.append(tier_filter)
+    return shapes
+
+
+def plan_stages(plan):
+    """Every stage name in an explain() plan tree"""
+    stages = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(plan['stage'])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def advise(db):
+    """Explain every route query shape and report those doing collection scans"""
+    scans = []
+    for route, collection, query, sort in query_shapes(db):
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = plan_stages(cursor.explain()['queryPlanner']['winningPlan'])
+        if 'COLLSCAN' in stages:
+            scans.append((route, collection))
+            print(f"❌ {route:<22} {collection:<16} COLLSCAN")
+        else:
+            print(f"✅ {route:<22} {collection:<16} {' <- '.join(stages)}")
+    if scans:
+        print(f"⚠️  {len(scans)} query shapes scan a whole collection; run python indexes.py to create indexes")
+    return scans
+
+
+def main():
+    app_config = config[os.environ.get('FLASK_ENV', 'default')]
+    parser = argparse.ArgumentParser(description='Create MongoDB indexes or check route queries against them')
+    parser.add_argument('--advise', action='store_true', help='Explain route queries and flag collection scans')
+    parser.add_argument('--mongo-uri', default=app_config.MONGO_URI, help='MongoDB connection string')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri).get_default_database()
+    if args.advise:
+        advise(db)
+    else:
+        ensure_indexes(db)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
+from flask import (Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory,
+                   Response, stream_with_context)
 from flask_pymongo import PyMongo
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -6,13 +7,25 @@ from werkzeug.utils import secure_filename
 from flask_mail import Mail, Message
 from itsdangerous import URLSafeTimedSerializer
 import os
+import json
+import math
+import zlib
 from datetime import datetime, timezone, timedelta
 import random
 import string
 from bson import ObjectId
 from PIL import Image
 import io
+import threading
+from cache import TTLCache
 from config import config
+from indexes import ensure_indexes_in_background
+from matching import (CARD_FIELDS, SCORING_FIELDS, CandidateProfile, bio_signature, calculate_compatibility,
+                      compatibility_pipeline, find_top_matches, match_pair_id, normalize_tag, profile_completeness,
+                      ranking_key)
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from realtime import MemoryBroker, create_broker
 
 # Load environment variables from .env file
 try:
@@ -49,6 +62,13 @@ welcome_mail = mail
 # Initialize serializer for password reset tokens
 serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'])
 
+# Chat streams each keep a worker thread busy, so only this many run at once
+max_streams = app.config.get('REALTIME_MAX_STREAMS', 4)
+stream_slots = threading.BoundedSemaphore(max_streams) if max_streams > 0 else None
+
+# Mutual matches already confirmed, keyed by match pair ID (chat polls check this every few seconds)
+match_cache = TTLCache(app.config.get('MATCH_CACHE_SIZE', 10000), app.config.get('MATCH_CACHE_TTL', 300))
+
 # MongoDB Atlas Configuration
 try:
     mongo = PyMongo(app)
@@ -57,6 +77,12 @@ try:
     print("✅ MongoDB Atlas connection successful!")
     print(f"   Database: {mongo.db.name}")
     print(f"   Collections: {mongo.db.list_collection_names()}")
+    # Create missing indexes without holding up startup
+    if app.config.get('ENSURE_INDEXES_ON_STARTUP', True):
+        ensure_indexes_in_background(mongo.db)
+    # Pub/sub broker pushing new chat messages to open streams
+    broker = create_broker(app.config.get('REALTIME_BACKEND', 'memory'), mongo.db,
+                           app.config.get('REALTIME_CAPPED_SIZE', 8 * 1024 * 1024))
 except Exception as e:
     print(f"❌ MongoDB Atlas connection failed: {e}")
     print("Please ensure:")
@@ -65,6 +91,18 @@ except Exception as e:
     print("3. Database user credentials are correct")
     print("4. Connection string is properly formatted")
     print("\nCheck MONGODB_SETUP.md for detailed setup instructions")
+    # Without MongoDB, chat events only reach streams served by this process
+    broker = create_broker('memory')
+
+def listen_for_ended_matches():
+    """Drop matches ended in other processes from this worker's match cache (runs in a thread)"""
+    for event in broker.listen('match-cache', math.inf, heartbeat=60):
+        if event:
+            match_cache.invalidate(*event['pair_ids'])
+
+# A shared broker carries match cache invalidations between workers (and to the gateway)
+if not isinstance(broker, MemoryBroker):
+    threading.Thread(target=listen_for_ended_matches, name='match-cache-listener', daemon=True).start()
 
 # Configure and initialize Flask-Mail
 mail.init_app(app)
@@ -168,6 +206,36 @@ Founded by Suraj Kumar - CEO
         print(f"Error sending email: {e}")
         return False
 
+# Process-local cache of the shared tag vocabulary (normalized tag -> integer ID)
+_tag_ids = {}
+
+def intern_tags(tags):
+    """Map interests, study habits or life goals to sorted integer IDs in the shared tag vocabulary"""
+    tag_ids = set()
+    for tag in tags:
+        tag = normalize_tag(tag)
+        if not tag:
+            continue
+        if tag not in _tag_ids:
+            vocab_entry = mongo.db.tag_vocabulary.find_one({'_id': tag})
+            if not vocab_entry:
+                # Allocate the next ID atomically so every worker agrees on it
+                counter = mongo.db.counters.find_one_and_update(
+                    {'_id': 'tag_id'},
+                    {'$inc': {'seq': 1}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                try:
+                    mongo.db.tag_vocabulary.insert_one({'_id': tag, 'tag_id': counter['seq'] - 1})
+                except DuplicateKeyError:
+                    # Another request interned the same tag first; use its ID
+                    pass
+                vocab_entry = mongo.db.tag_vocabulary.find_one({'_id': tag})
+            _tag_ids[tag] = vocab_entry['tag_id']
+        tag_ids.add(_tag_ids[tag])
+    return sorted(tag_ids)
+
 def generate_otp():
     """Generate a 6-digit OTP"""
     return ''.join(random.choices(string.digits, k=6))
@@ -385,9 +453,17 @@ class User(UserMixin):
         self.study_habits = user_data.get('study_habits', [])
         self.personality_type = user_data.get('personality_type', '')
         self.life_goals = user_data.get('life_goals', [])
+        # Interned tag IDs (None for profiles saved before the tag vocabulary existed)
+        self.interest_ids = frozenset(user_data['interest_ids']) if 'interest_ids' in user_data else None
+        self.habit_ids = frozenset(user_data['habit_ids']) if 'habit_ids' in user_data else None
+        self.goal_ids = frozenset(user_data['goal_ids']) if 'goal_ids' in user_data else None
+        # Hashed bio tokens (None for profiles saved before bio signatures existed)
+        self.bio_signature = frozenset(user_data['bio_signature']) if 'bio_signature' in user_data else None
         self.compatibility_score = user_data.get('compatibility_score', 0)
         self.created_at = user_data.get('created_at', datetime.now(timezone.utc))
         self.unread_notifications = user_data.get('unread_notifications', 0)
+        # Bumped whenever this user's notifications change, for conditional polling
+        self.notifications_version = user_data.get('notifications_version', 0)
         
         # Calculate compatibility score
         self.calculate_compatibility_score()
@@ -451,6 +527,9 @@ def upload_profile_picture():
                 current_user.profile_picture = filename
                 current_user.calculate_compatibility_score()
                 
+                # Notifications of this user's likes show the new picture
+                refresh_liker_snapshots(current_user)
+                
                 return jsonify({
                     'success': True, 
                     'message': 'Profile picture updated successfully!',
@@ -564,85 +643,6 @@ def reset_password(token):
     
     return render_template('reset_password.html')
 
-# Add compatibility calculation function
-def calculate_compatibility(user1, user2):
-    """Calculate compatibility score between two users"""
-    score = 0
-    
-    # Interest matching (35 points) - Increased importance
-    if user1.interests and user2.interests:
-        common_interests = set(interest.strip().lower() for interest in user1.interests) & set(interest.strip().lower() for interest in user2.interests)
-        if common_interests:
-            score += min(len(common_interests) * 12, 35)
-    
-    # Study habits compatibility (25 points) - Increased importance
-    if user1.study_habits and user2.study_habits:
-        common_habits = set(habit.strip().lower() for habit in user1.study_habits) & set(habit.strip().lower() for habit in user2.study_habits)
-        if common_habits:
-            score += min(len(common_habits) * 8, 25)
-    
-    # Life goals compatibility (20 points) - New high priority
-    if user1.life_goals and user2.life_goals:
-        common_goals = set(goal.strip().lower() for goal in user1.life_goals) & set(goal.strip().lower() for goal in user2.life_goals)
-        if common_goals:
-            score += min(len(common_goals) * 10, 20)
-    
-    # Bio compatibility (15 points) - New field for text similarity
-    if user1.bio and user2.bio:
-        # Simple keyword matching for bio compatibility
-        bio1_words = set(user1.bio.lower().split())
-        bio2_words = set(user2.bio.lower().split())
-        common_bio_words = bio1_words & bio2_words
-        if len(common_bio_words) >= 3:  # At least 3 common words
-            score += 15
-        elif len(common_bio_words) >= 1:  # At least 1 common word
-            score += 8
-    
-    # Location matching (15 points) - Reduced importance
-    if user1.location and user2.location and user1.location == user2.location:
-        score += 15
-    
-    # Course compatibility (10 points) - Reduced importance
-    if user1.course == user2.course:
-        score += 10
-    elif user1.course and user2.course:
-        # Similar fields get partial points
-        similar_courses = {
-            '(B.Tech)': ['(M.Tech)', '(B.S)'],
-            '(M.Tech)': ['(B.Tech)', '(Ph.D)'],
-            '(B.S)': ['(B.Tech)', '(M.Sc)'],
-            '(M.Sc)': ['(B.S)', '(Ph.D)'],
-            '(MBA)': ['(B.Tech)', '(M.Tech)'],
-            '(Ph.D)': ['(M.Tech)', '(M.Sc)'],
-            'Humanities': ['(B.S)', '(M.Sc)'],
-            'OTHERs': ['(B.Tech)', '(M.Sc)', 'Humanities']
-        }
-        if user1.course in similar_courses and user2.course in similar_courses[user1.course]:
-            score += 7
-    
-    # Year compatibility (8 points) - Reduced importance
-    year_diff = abs(int(user1.year) - int(user2.year))
-    if year_diff == 0:
-        score += 8
-    elif year_diff == 1:
-        score += 6
-    elif year_diff == 2:
-        score += 4
-    
-    # Personality compatibility (12 points) - Reduced importance
-    if user1.personality_type and user2.personality_type:
-        compatible_pairs = [
-            ('Introvert', 'Extrovert'),
-            ('Analytical', 'Creative'),
-            ('Adventurous', 'Cautious')
-        ]
-        if (user1.personality_type, user2.personality_type) in compatible_pairs or (user2.personality_type, user1.personality_type) in compatible_pairs:
-            score += 12
-        elif user1.personality_type == user2.personality_type:
-            score += 8
-    
-    return min(score, 100)
-
 # Add template function for compatibility calculation
 @app.template_filter('calculateCompatibility')
 def calculate_compatibility_filter(user1, user2):
@@ -653,28 +653,14 @@ def calculate_compatibility_filter(user1, user2):
 def suggest_matches():
     """Suggest additional matches for users who might not have any"""
     try:
-        # Get users who haven't been liked by current user
-        liked_users = mongo.db.likes.find({'liker_id': ObjectId(current_user.id)})
-        liked_user_ids = [like['liked_id'] for like in liked_users]
-        
-        # Find users with similar interests and compatibility
-        suggested_matches = []
-        all_users = mongo.db.users.find({
-            '_id': {'$ne': ObjectId(current_user.id)},
-            '_id': {'$nin': liked_user_ids}
-        })
-        
-        for user_data in all_users:
-            user = User(user_data)
-            compatibility = calculate_compatibility(current_user, user)
-            user.compatibility_score = compatibility
-            
-            # Only suggest if compatibility is above threshold
-            if compatibility >= 30:  # Minimum 30% compatibility
-                suggested_matches.append(user)
-        
-        # Sort by compatibility score
-        suggested_matches.sort(key=lambda x: x.compatibility_score, reverse=True)
+        # Read the stored suggestions (already-liked users are never stored)
+        recommendations = get_recommendations(current_user)
+        entries = sorted(
+            (entry for entry in recommendations['suggestions'] if entry['score'] >= 30),  # Minimum 30% compatibility
+            key=entry_key,
+            reverse=True
+        )
+        suggested_matches = hydrate_recommendations(entries[:5])  # Top 5 suggestions
         
         return jsonify({
             'success': True,
@@ -688,7 +674,7 @@ def suggest_matches():
                     'location': user.location,
                     'personality': user.personality_type
                 }
-                for user in suggested_matches[:5]  # Top 5 suggestions
+                for user in suggested_matches
             ]
         })
     except Exception as e:
@@ -704,6 +690,11 @@ def index():
         app.logger.error(f'Error in index route: {e}')
         return render_template('500.html'), 500
 
+@app.route('/health')
+def health():
+    """Liveness check reporting this worker's match cache counters"""
+    return jsonify({'status': 'ok', 'match_cache': match_cache.stats()})
+
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -762,6 +753,10 @@ def register():
                 'study_habits': [],
                 'personality_type': '',
                 'life_goals': [],
+                'interest_ids': [],
+                'habit_ids': [],
+                'goal_ids': [],
+                'bio_signature': [],
                 'compatibility_score': 0,
                 'created_at': datetime.now(timezone.utc),
                 'is_verified': False,  # Account not verified yet
@@ -840,6 +835,12 @@ def verify_otp(user_id):
                         }}
                     )
                     
+                    # Add the new profile to the stored rankings it belongs in
+                    try:
+                        patch_recommendations(CandidateProfile(user_data))
+                    except Exception as e:
+                        print(f"Error adding new user to recommendations: {e}")
+                    
                     # Send welcome email
                     send_signup_confirmation_email(
                         user_data.get('email'), 
@@ -928,60 +929,300 @@ def logout():
     logout_user()
     return redirect(url_for('index'))
 
+def dashboard_filter(user, fallback=False):
+    """Candidate filter for the dashboard, optionally ignoring gender preferences"""
+    if fallback:
+        return {'_id': {'$ne': ObjectId(user.id)}}
+    return {
+        '_id': {'$ne': ObjectId(user.id)},
+        'gender': user.interested_in,
+        'interested_in': user.gender
+    }
+
+def recommendation_entry(profile):
+    """Compact ranked-list entry stored in the recommendations collection"""
+    score, completeness, _ = ranking_key(profile)
+    return {'user_id': ObjectId(profile.id), 'score': score, 'completeness': completeness}
+
+def entry_key(entry):
+    """Ranking key of a stored recommendation entry, comparable with ranking_key()"""
+    return (entry['score'], entry['completeness'], str(entry['user_id']))
+
+def rank_candidates(user, base_filter, limit=None, min_score=0, after=None):
+    """Rank candidates as recommendation entries, scoring in Python or inside MongoDB"""
+    if app.config.get('COMPATIBILITY_SCORING') == 'aggregation':
+        # Only IDs and scores come back over the wire
+        return [
+            {'user_id': result['_id'], 'score': result['score'], 'completeness': result['completeness']}
+            for result in mongo.db.users.aggregate(compatibility_pipeline(user, base_filter, limit, min_score, after))
+        ]
+    matches = find_top_matches(mongo.db.users, user, base_filter, limit=limit, min_score=min_score, after=after)
+    return [recommendation_entry(profile) for profile in matches]
+
+def build_recommendations(user):
+    """Compute and store the ranked dashboard and suggestion lists for a user"""
+    limit = app.config.get('RECOMMENDATIONS_LIMIT', 100)
+    
+    # Dashboard ranking, falling back to all users if nobody matches the gender preferences
+    dashboard_fallback = False
+    dashboard_entries = rank_candidates(user, dashboard_filter(user), limit=limit)
+    if not dashboard_entries:
+        dashboard_fallback = True
+        dashboard_entries = rank_candidates(user, dashboard_filter(user, fallback=True), limit=limit)
+    
+    # Suggestions exclude users that have already been liked
+    liked_user_ids = [like['liked_id'] for like in mongo.db.likes.find({'liker_id': ObjectId(user.id)}, {'liked_id': 1})]
+    suggestion_entries = rank_candidates(
+        user,
+        {'_id': {'$nin': liked_user_ids + [ObjectId(user.id)]}},
+        limit=limit,
+        min_score=30  # Minimum 30% compatibility
+    )
+    
+    recommendations = {
+        '_id': ObjectId(user.id),
+        # The owner's preferences, so profile edits only patch lists whose pool can hold the edited user
+        'gender': user.gender,
+        'interested_in': user.interested_in,
+        'dashboard_fallback': dashboard_fallback,
+        # A full list may have more candidates past its end; skips and deletions shrink it later
+        'dashboard_truncated': len(dashboard_entries) >= limit,
+        'dashboard': dashboard_entries,
+        'suggestions': suggestion_entries,
+        'computed_at': datetime.now(timezone.utc)
+    }
+    mongo.db.recommendations.replace_one({'_id': recommendations['_id']}, recommendations, upsert=True)
+    return recommendations
+
+def get_recommendations(user):
+    """Read a user's stored recommendations, rebuilding them when missing or expired"""
+    recommendations = mongo.db.recommendations.find_one({'_id': ObjectId(user.id)})
+    if recommendations:
+        computed_at = recommendations['computed_at']
+        if computed_at.tzinfo is None:
+            # If naive datetime, assume it's UTC
+            computed_at = computed_at.replace(tzinfo=timezone.utc)
+        if datetime.now(timezone.utc) - computed_at < app.config.get('RECOMMENDATIONS_TTL', timedelta(hours=26)):
+            return recommendations
+    return build_recommendations(user)
+
+def hydrate_recommendations(entries):
+    """Load the user profiles for stored entries in one query, keeping their order"""
+    users_by_id = {
+        user_data['_id']: user_data
+        for user_data in mongo.db.users.find({'_id': {'$in': [entry['user_id'] for entry in entries]}}, CARD_FIELDS)
+    }
+    profiles = []
+    for entry in entries:
+        # Users deleted since the list was stored are skipped
+        if entry['user_id'] in users_by_id:
+            profile = CandidateProfile(users_by_id[entry['user_id']])
+            profile.compatibility_score = entry['score']
+            profiles.append(profile)
+    return profiles
+
+def ranked_below(entry):
+    """Filter matching stored entries that rank below ``entry``"""
+    return {'$or': [
+        {'score': {'$lt': entry['score']}},
+        {'score': entry['score'], 'completeness': {'$lt': entry['completeness']}},
+        {'score': entry['score'], 'completeness': entry['completeness'], 'user_id': {'$lt': entry['user_id']}}
+    ]}
+
+def ranked_insert(entry, limit):
+    """$push modifiers inserting an entry in ranking order, keeping the best ``limit`` entries"""
+    return {'$each': [entry], '$sort': {'score': -1, 'completeness': -1, 'user_id': -1}, '$slice': limit}
+
+def patch_recommendations(user):
+    """Re-score a changed or new profile in the stored lists it belongs in.
+
+    Lists that contain the profile get its new score. Lists still in use
+    whose dashboard pool can hold the profile (owners preferring its gender,
+    or dashboards that fell back to everyone) get it inserted in rank order
+    when it beats their lowest entry, or whenever a dashboard holds every
+    candidate, so new and improved profiles show up before the lists
+    expire. Other owners only see it in their suggestions once their lists
+    are rebuilt, which keeps the cost of an edit to the profile's own pool.
+    """
+    user_id = ObjectId(user.id)
+    limit = app.config.get('RECOMMENDATIONS_LIMIT', 100)
+    
+    # The user's own rankings are rebuilt on their next dashboard load
+    mongo.db.recommendations.delete_one({'_id': user_id})
+    
+    containing = set(
+        recommendations['_id']
+        for recommendations in mongo.db.recommendations.find(
+            {'$or': [{'dashboard.user_id': user_id}, {'suggestions.user_id': user_id}]},
+            {'_id': 1}
+        )
+    )
+    fresh_after = datetime.now(timezone.utc) - app.config.get('RECOMMENDATIONS_TTL', timedelta(hours=26))
+    dashboard_fallback = {
+        recommendations['_id']: recommendations.get('dashboard_fallback', False)
+        for recommendations in mongo.db.recommendations.find(
+            {'computed_at': {'$gte': fresh_after}, '$or': [
+                {'dashboard_fallback': True},
+                {'gender': user.interested_in, 'interested_in': user.gender}
+            ]},
+            {'dashboard_fallback': 1}
+        )
+    }
+    owner_ids = containing | set(dashboard_fallback)
+    if not owner_ids:
+        return
+    
+    liked_by = set(like['liker_id'] for like in mongo.db.likes.find({'liked_id': user_id}, {'liker_id': 1}))
+    updates = []
+    completeness = profile_completeness(user)
+    for owner_data in mongo.db.users.find({'_id': {'$in': list(owner_ids)}}, SCORING_FIELDS):
+        owner_id = owner_data['_id']
+        score = calculate_compatibility(CandidateProfile(owner_data), user)
+        if owner_id in containing:
+            updates.append(UpdateOne(
+                {'_id': owner_id},
+                {'$set': {
+                    'dashboard.$[entry].score': score,
+                    'dashboard.$[entry].completeness': completeness,
+                    'suggestions.$[entry].score': score,
+                    'suggestions.$[entry].completeness': completeness
+                }},
+                array_filters=[{'entry.user_id': user_id}]
+            ))
+        if owner_id not in dashboard_fallback:
+            continue
+        
+        entry = {'user_id': user_id, 'score': score, 'completeness': completeness}
+        preferred = owner_data.get('gender') == user.interested_in and owner_data.get('interested_in') == user.gender
+        if preferred and dashboard_fallback[owner_id]:
+            # The list fell back to everyone because nobody matched the owner's preferences; now someone does
+            updates.append(DeleteOne({'_id': owner_id}))
+            continue
+        if preferred or dashboard_fallback[owner_id]:
+            missing = {'_id': owner_id, 'dashboard.user_id': {'$ne': user_id}}
+            # A list holding every candidate with room to spare takes the user wherever it ranks
+            updates.append(UpdateOne(
+                dict(missing, dashboard_truncated=False, **{f'dashboard.{limit - 1}': {'$exists': False}}),
+                {'$push': {'dashboard': ranked_insert(entry, limit)}}
+            ))
+            # A capped list takes the user only above its lowest entry, which may then drop off the end
+            updates.append(UpdateOne(
+                dict(missing, **{'$and': [
+                    {'$or': [{'dashboard_truncated': {'$ne': False}}, {f'dashboard.{limit - 1}': {'$exists': True}}]},
+                    {'dashboard': {'$elemMatch': ranked_below(entry)}}
+                ]}),
+                {'$push': {'dashboard': ranked_insert(entry, limit)}, '$set': {'dashboard_truncated': True}}
+            ))
+        if score >= 30 and owner_id not in liked_by:  # Minimum 30% compatibility
+            updates.append(UpdateOne(
+                {'_id': owner_id, 'suggestions.user_id': {'$ne': user_id}},
+                {'$push': {'suggestions': ranked_insert(entry, limit)}}
+            ))
+    if updates:
+        mongo.db.recommendations.bulk_write(updates, ordered=False)
+
+def remove_from_recommendations(user_id):
+    """Drop a deleted user's own rankings and every stored entry pointing at them"""
+    user_id = ObjectId(user_id)
+    mongo.db.recommendations.delete_one({'_id': user_id})
+    mongo.db.recommendations.update_many(
+        {'$or': [{'dashboard.user_id': user_id}, {'suggestions.user_id': user_id}]},
+        {'$pull': {'dashboard': {'user_id': user_id}, 'suggestions': {'user_id': user_id}}}
+    )
+
+def get_dashboard_page(cursor=None):
+    """Return one page of potential matches and the cursor for the next page"""
+    per_page = app.config.get('USERS_PER_PAGE', 10)
+    after = serializer.loads(cursor, salt='dashboard-cursor') if cursor else None
+    
+    # Read the stored ranking, fetching one extra match to know whether another page exists
+    recommendations = get_recommendations(current_user)
+    entries = sorted(recommendations['dashboard'], key=entry_key, reverse=True)
+    if after:
+        entries = [entry for entry in entries if entry_key(entry) < tuple(after)]
+    entries = entries[:per_page + 1]
+    
+    # The stored list is capped, so continue past its end with a live query
+    # (lists stored before the flag existed are treated as capped)
+    if len(entries) <= per_page and recommendations.get('dashboard_truncated', True):
+        entries += rank_candidates(
+            current_user,
+            dashboard_filter(current_user, recommendations['dashboard_fallback']),
+            limit=per_page + 1 - len(entries),
+            after=entry_key(entries[-1]) if entries else after
+        )
+    
+    next_cursor = None
+    if len(entries) > per_page:
+        entries = entries[:per_page]
+        next_cursor = serializer.dumps(list(entry_key(entries[-1])), salt='dashboard-cursor')
+    return hydrate_recommendations(entries), next_cursor
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
     try:
-        # Get potential matches based on gender preferences
-        potential_matches = []
-        users_cursor = mongo.db.users.find({
-            '_id': {'$ne': ObjectId(current_user.id)},
-            'gender': current_user.interested_in,
-            'interested_in': current_user.gender
-        })
-        
-        for user_data in users_cursor:
-            user = User(user_data)
-            # Calculate compatibility score for this user
-            compatibility = calculate_compatibility(current_user, user)
-            user.compatibility_score = compatibility
-            potential_matches.append(user)
-        
-        # Sort by compatibility score (highest first) to show best matches first
-        potential_matches.sort(key=lambda x: x.compatibility_score, reverse=True)
-        
-        # If no matches found, try to find users with similar interests regardless of gender
-        if not potential_matches:
-            fallback_users = mongo.db.users.find({
-                '_id': {'$ne': ObjectId(current_user.id)}
-            })
-            
-            for user_data in fallback_users:
-                user = User(user_data)
-                compatibility = calculate_compatibility(current_user, user)
-                user.compatibility_score = compatibility
-                potential_matches.append(user)
-            
-            # Sort by compatibility score
-            potential_matches.sort(key=lambda x: x.compatibility_score, reverse=True)
-        
-        # Additional sorting: prioritize users with complete profiles (interests, study habits, life goals, bio)
-        def profile_completeness_score(user):
-            score = 0
-            if user.interests: score += 1
-            if user.study_habits: score += 1
-            if user.life_goals: score += 1
-            if user.bio: score += 1
-            return score
-        
-        # Sort by compatibility first, then by profile completeness
-        potential_matches.sort(key=lambda x: (x.compatibility_score, profile_completeness_score(x)), reverse=True)
-        
-        return render_template('dashboard.html', potential_matches=potential_matches)
+        potential_matches, next_cursor = get_dashboard_page()
+        return render_template('dashboard.html', potential_matches=potential_matches, next_cursor=next_cursor)
     except Exception as e:
         flash(f'Error loading dashboard: {str(e)}', 'error')
         return render_template('dashboard.html', potential_matches=[])
 
+@app.route('/dashboard/more')
+@login_required
+def dashboard_more():
+    """Load the next page of potential matches for the dashboard"""
+    try:
+        cursor = request.args.get('cursor')
+        if not cursor:
+            return jsonify({'success': False, 'message': 'Missing cursor'})
+        
+        potential_matches, next_cursor = get_dashboard_page(cursor)
+        
+        return jsonify({
+            'success': True,
+            'html': ''.join(render_template('_match_card.html', user=user) for user in potential_matches),
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+def is_mutual_match(user_a, user_b):
+    """Check whether two users have liked each other"""
+    pair_id = match_pair_id(user_a, user_b)
+    if match_cache.get(pair_id):
+        return True
+    # Only confirmed matches are cached, so a new match is never hidden by a stale miss
+    matched = mongo.db.matches.find_one({'_id': pair_id}, {'_id': 1}) is not None
+    if matched:
+        match_cache.set(pair_id, True)
+    return matched
+
+def forget_matches(pair_ids):
+    """Drop ended matches from the match cache of every worker and the gateway"""
+    match_cache.invalidate(*pair_ids)
+    if pair_ids:
+        broker.publish('match-cache', {'pair_ids': [str(pair_id) for pair_id in pair_ids]})
+
+def match_upsert(user_a, user_b, matched_at=None):
+    """Upsert storing a mutual match once, whichever user completes it"""
+    low, high = sorted([str(user_a), str(user_b)])
+    matched_at = matched_at or datetime.now(timezone.utc)
+    return UpdateOne(
+        {'_id': match_pair_id(low, high)},
+        {'$setOnInsert': {
+            'users': [ObjectId(low), ObjectId(high)],
+            'created_at': matched_at,
+            # New matches start at the top of both users' inboxes
+            'last_activity': matched_at
+        }},
+        upsert=True
+    )
+
+def record_match(user_a, user_b, matched_at=None):
+    """Store a mutual match once, whichever user completes it"""
+    mongo.db.matches.bulk_write([match_upsert(user_a, user_b, matched_at)])
+
 @app.route('/profile/<user_id>')
 @login_required
 def profile(user_id):
@@ -999,19 +1240,10 @@ def profile(user_id):
             'liked_id': ObjectId(user_id)
         })
         
-        # Check if this is a mutual match
-        is_mutual_match = False
-        if has_liked:
-            mutual_like = mongo.db.likes.find_one({
-                'liker_id': ObjectId(user_id),
-                'liked_id': ObjectId(current_user.id)
-            })
-            is_mutual_match = bool(mutual_like)
-        
         return render_template('profile.html', 
                              user=user, 
                              has_liked=bool(has_liked), 
-                             is_mutual_match=is_mutual_match)
+                             is_mutual_match=bool(has_liked) and is_mutual_match(current_user.id, user_id))
     except Exception as e:
         flash(f'Error loading profile: {str(e)}', 'error')
         return redirect(url_for('dashboard'))
@@ -1035,6 +1267,11 @@ def edit_profile():
             study_habits = [habit.strip() for habit in request.form.get('study_habits', '').split(',') if habit.strip()] if request.form.get('study_habits') else []
             life_goals = [goal.strip() for goal in request.form.get('life_goals', '').split(',') if goal.strip()] if request.form.get('life_goals') else []
             
+            # Intern tags so compatibility scoring can compare tag IDs
+            interest_ids = intern_tags(interests)
+            habit_ids = intern_tags(study_habits)
+            goal_ids = intern_tags(life_goals)
+            
             # Update user profile in MongoDB Atlas
             mongo.db.users.update_one(
                 {'_id': ObjectId(current_user.id)},
@@ -1048,7 +1285,11 @@ def edit_profile():
                     'interests': interests,
                     'study_habits': study_habits,
                     'personality_type': personality_type,
-                    'life_goals': life_goals
+                    'life_goals': life_goals,
+                    'interest_ids': interest_ids,
+                    'habit_ids': habit_ids,
+                    'goal_ids': goal_ids,
+                    'bio_signature': bio_signature(bio)
                 }}
             )
             
@@ -1063,10 +1304,20 @@ def edit_profile():
             current_user.study_habits = study_habits
             current_user.personality_type = personality_type
             current_user.life_goals = life_goals
+            current_user.interest_ids = frozenset(interest_ids)
+            current_user.habit_ids = frozenset(habit_ids)
+            current_user.goal_ids = frozenset(goal_ids)
+            current_user.bio_signature = frozenset(bio_signature(bio))
             
             # Recalculate compatibility score
             current_user.calculate_compatibility_score()
             
+            # Update this profile's score in other users' stored recommendations
+            patch_recommendations(current_user)
+            
+            # Notifications of this user's likes show the new name
+            refresh_liker_snapshots(current_user)
+            
             flash('Profile updated successfully!', 'success')
             return redirect(url_for('profile', user_id=current_user.id))
         except Exception as e:
@@ -1074,64 +1325,138 @@ def edit_profile():
     
     return render_template('edit_profile.html')
 
-@app.route('/like_user/<user_id>', methods=['POST'])
-@login_required
-def like_user(user_id):
-    try:
-        if user_id == current_user.id:
-            return jsonify({'success': False, 'message': 'You cannot like yourself!'})
-        
-        # Check if already liked
-        existing_like = mongo.db.likes.find_one({
-            'liker_id': ObjectId(current_user.id),
-            'liked_id': ObjectId(user_id)
-        })
-        
-        if existing_like:
-            return jsonify({'success': False, 'message': 'You already liked this user!'})
-        
-        # Add like to MongoDB Atlas
-        like_data = {
-            'liker_id': ObjectId(current_user.id),
-            'liked_id': ObjectId(user_id),
-            'timestamp': datetime.now(timezone.utc)
-        }
-        mongo.db.likes.insert_one(like_data)
-        
-        # Create notification for the liked user
-        notification_data = {
-            'liker_id': ObjectId(current_user.id),
-            'receiver_id': ObjectId(user_id),
-            'message': f"{current_user.first_name} {current_user.last_name} liked your profile!",
-            'timestamp': datetime.now(timezone.utc),
-            'is_read': False
-        }
-        mongo.db.notifications.insert_one(notification_data)
-        
-        # Check for mutual match
-        mutual_match = mongo.db.likes.find_one({
-            'liker_id': ObjectId(user_id),
-            'liked_id': ObjectId(current_user.id)
-        })
-        
-        # If it's a mutual match, send notification email
-        if mutual_match:
+def apply_swipes(user, decisions):
+    """Apply like/skip decisions with a few bulk writes, returning one result per decision"""
+    liker_id = ObjectId(user.id)
+    now = datetime.now(timezone.utc)
+    results = []
+    pending_likes = {}
+    skipped_ids = []
+    for decision in decisions:
+        decision = decision if isinstance(decision, dict) else {}
+        user_id = str(decision.get('user_id', ''))
+        action = decision.get('action', 'like')
+        result = {'user_id': user_id, 'action': action, 'success': False, 'is_match': False}
+        results.append(result)
+        if action not in ('like', 'skip') or not ObjectId.is_valid(user_id):
+            result['message'] = 'Invalid decision!'
+        elif user_id == user.id:
+            result['message'] = 'You cannot like yourself!'
+        elif user_id in pending_likes or ObjectId(user_id) in skipped_ids:
+            result['message'] = 'Duplicate decision!'
+        elif action == 'skip':
+            skipped_ids.append(ObjectId(user_id))
+            result.update(success=True, message='Skipped')
+        else:
+            pending_likes[user_id] = result
+    liked_ids = [ObjectId(user_id) for user_id in pending_likes]
+    
+    # Check which users are already liked
+    already_liked = set(
+        like['liked_id']
+        for like in mongo.db.likes.find({'liker_id': liker_id, 'liked_id': {'$in': liked_ids}}, {'liked_id': 1})
+    ) if liked_ids else set()
+    new_ids = [liked_id for liked_id in liked_ids if liked_id not in already_liked]
+    
+    # Add likes to MongoDB Atlas
+    if new_ids:
+        try:
+            mongo.db.likes.bulk_write([
+                InsertOne({'liker_id': liker_id, 'liked_id': liked_id, 'timestamp': now})
+                for liked_id in new_ids
+            ], ordered=False)
+        except BulkWriteError as e:
+            # Likes stored meanwhile by a concurrent request hit the unique pair index
+            if any(error['code'] != 11000 for error in e.details['writeErrors']):
+                raise
+            already_liked.update(new_ids[error['index']] for error in e.details['writeErrors'])
+            new_ids = [liked_id for liked_id in new_ids if liked_id not in already_liked]
+    
+    # Create notifications for the liked users
+    if new_ids:
+        mongo.db.notifications.bulk_write([
+            InsertOne({
+                'liker_id': liker_id,
+                'receiver_id': liked_id,
+                # Snapshot of the liker's display data, so listing notifications needs no user lookups
+                'liker_name': f"{user.first_name} {user.last_name}",
+                'liker_picture': user.profile_picture or '',
+                'message': f"{user.first_name} {user.last_name} liked your profile!",
+                'timestamp': now,
+                'is_read': False
+            })
+            for liked_id in new_ids
+        ], ordered=False)
+        bump_notifications_version(new_ids, unread=1)
+    
+    # Check for mutual matches (after our likes are stored, so simultaneous likes still match)
+    matched_ids = set(
+        like['liker_id']
+        for like in mongo.db.likes.find({'liker_id': {'$in': new_ids}, 'liked_id': liker_id}, {'liker_id': 1})
+    ) if new_ids else set()
+    if matched_ids:
+        mongo.db.matches.bulk_write([match_upsert(liker_id, matched_id, now) for matched_id in matched_ids])
+        match_cache.invalidate(*(match_pair_id(liker_id, matched_id) for matched_id in matched_ids))
+    
+    # Liked and skipped users are no longer suggested; skipped ones leave the dashboard too
+    if liked_ids or skipped_ids:
+        pull = {'suggestions': {'user_id': {'$in': liked_ids + skipped_ids}}}
+        if skipped_ids:
+            pull['dashboard'] = {'user_id': {'$in': skipped_ids}}
+        mongo.db.recommendations.update_one({'_id': liker_id}, {'$pull': pull})
+    
+    for user_id, result in pending_likes.items():
+        if ObjectId(user_id) in already_liked:
+            result['message'] = 'You already liked this user!'
+        else:
+            result['is_match'] = ObjectId(user_id) in matched_ids
+            result.update(success=True, message='It\'s a match!' if result['is_match'] else 'Like sent successfully!')
+    
+    # Send match notification emails
+    if matched_ids:
+        for receiver_data in mongo.db.users.find(
+                {'_id': {'$in': list(matched_ids)}}, {'email': 1, 'first_name': 1, 'last_name': 1}):
             try:
-                # Get receiver's email
-                receiver_data = mongo.db.users.find_one({'_id': ObjectId(user_id)})
-                if receiver_data and receiver_data.get('email'):
+                if receiver_data.get('email'):
                     send_match_notification_email(
                         receiver_data['email'],
-                        f"{current_user.first_name} {current_user.last_name}",
+                        f"{user.first_name} {user.last_name}",
                         f"{receiver_data.get('first_name', '')} {receiver_data.get('last_name', '')}"
                     )
             except Exception as e:
                 print(f"Error sending match notification email: {e}")
+    
+    return results
+
+@app.route('/like_user/<user_id>', methods=['POST'])
+@login_required
+def like_user(user_id):
+    try:
+        result = apply_swipes(current_user, [{'user_id': user_id, 'action': 'like'}])[0]
+        return jsonify({
+            'success': result['success'],
+            'message': result['message'],
+            'is_match': result['is_match']
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@app.route('/swipe_batch', methods=['POST'])
+@login_required
+def swipe_batch():
+    """Apply many like/skip decisions from the dashboard in one request"""
+    try:
+        decisions = (request.get_json(silent=True) or {}).get('decisions')
+        if not decisions or not isinstance(decisions, list):
+            return jsonify({'success': False, 'message': 'No decisions to apply!'})
+        if len(decisions) > app.config.get('SWIPE_BATCH_LIMIT', 50):
+            return jsonify({'success': False, 'message': 'Too many decisions in one batch!'})
         
+        results = apply_swipes(current_user, decisions)
         return jsonify({
-            'success': True, 
-            'message': 'Like sent successfully!' if not mutual_match else 'It\'s a match!',
-            'is_match': bool(mutual_match)
+            'success': True,
+            'results': results,
+            'matches': [result['user_id'] for result in results if result['is_match']]
         })
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
@@ -1140,46 +1465,134 @@ def like_user(user_id):
 @login_required
 def matches():
     try:
-        # Find mutual matches using MongoDB Atlas aggregation
-        pipeline = [
-            {
-                '$match': {
-                    '$or': [
-                        {'liker_id': ObjectId(current_user.id)},
-                        {'liked_id': ObjectId(current_user.id)}
-                    ]
-                }
-            },
-            {
-                '$group': {
-                    '_id': {
-                        '$cond': [
-                            {'$eq': ['$liker_id', ObjectId(current_user.id)]},
-                            '$liked_id',
-                            '$liker_id'
-                        ]
-                    },
-                    'likes_count': {'$sum': 1}
-                }
-            },
-            {
-                '$match': {'likes_count': {'$gte': 2}}
-            }
+        per_page = app.config.get('USERS_PER_PAGE', 10)
+        page = max(request.args.get('page', 1, type=int), 1)
+        
+        # Read the current user's conversations, most recently active first
+        match_docs = list(
+            mongo.db.matches.find({'users': ObjectId(current_user.id)}, {'users': 1, 'unread': 1, 'last_message': 1})
+            .sort([('last_activity', -1), ('_id', -1)])
+            .skip((page - 1) * per_page)
+            # Fetch one extra match to know whether another page exists
+            .limit(per_page + 1)
+        )
+        has_next = len(match_docs) > per_page
+        matched_ids = [
+            next(user_id for user_id in match['users'] if user_id != ObjectId(current_user.id))
+            for match in match_docs[:per_page]
         ]
+        # Last message and unread count per matched user, kept on the match documents themselves
+        inbox = {
+            str(user_id): {
+                'last_message': match.get('last_message'),
+                'unread': max(match.get('unread', {}).get(current_user.id, 0), 0)
+            }
+            for user_id, match in zip(matched_ids, match_docs)
+        }
         
-        matches_result = list(mongo.db.likes.aggregate(pipeline))
-        
-        # Get matched users
-        user_matches = []
-        for match in matches_result:
-            user_data = mongo.db.users.find_one({'_id': match['_id']})
-            if user_data:
-                user_matches.append(User(user_data))
+        # Get all matched users in one round trip
+        users_by_id = {
+            user_data['_id']: user_data
+            for user_data in mongo.db.users.find({'_id': {'$in': matched_ids}}, CARD_FIELDS)
+        }
+        user_matches = [CandidateProfile(users_by_id[user_id]) for user_id in matched_ids if user_id in users_by_id]
         
-        return render_template('matches.html', matches=user_matches)
+        return render_template('matches.html', matches=user_matches, inbox=inbox, page=page, has_next=has_next)
     except Exception as e:
         flash(f'Error loading matches: {str(e)}', 'error')
-        return render_template('matches.html', matches=[])
+        return render_template('matches.html', matches=[], inbox={}, page=1, has_next=False)
+
+def timestamp_ms(value):
+    """Milliseconds since the epoch of a stored timestamp (naive values are UTC)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+def message_position(message):
+    """Sort position of a message within its conversation: (timestamp in ms, ID)"""
+    return (timestamp_ms(message['timestamp']), str(message['_id']))
+
+def message_cursor(message):
+    """Opaque cursor pointing at a message's position"""
+    return serializer.dumps(list(message_position(message)), salt='messages-cursor')
+
+def conversation_query(user_a, user_b, since=None, before=None, through=None):
+    """Query for the messages between two users, after ``since``, before ``before`` or up to ``through`` when given.
+
+    Positions are (timestamp ms, ID) pairs as stored in message cursors; each
+    branch is a range on the conversation/timestamp/ID index.
+    """
+    query = {'conversation_id': match_pair_id(user_a, user_b)}
+    position, operator = (since, '$gt') if since else (before, '$lt') if before else (through, '$lte')
+    if position:
+        timestamp = datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(milliseconds=position[0])
+        query['$or'] = [
+            {'timestamp': {operator: timestamp}},
+            {'timestamp': timestamp, '_id': {operator: ObjectId(position[1])}}
+        ]
+    return query
+
+def conversation_page(user_a, user_b, before=None):
+    """Newest page of messages (before a position when given), oldest first, and the cursor for older ones"""
+    per_page = app.config.get('MESSAGES_PER_PAGE', 50)
+    chat_messages = list(
+        mongo.db.messages.find(conversation_query(user_a, user_b, before=before))
+        .sort([('timestamp', -1), ('_id', -1)])
+        # Fetch one extra message to know whether older ones exist
+        .limit(per_page + 1)
+    )
+    older_cursor = None
+    if len(chat_messages) > per_page:
+        chat_messages = chat_messages[:per_page]
+        older_cursor = message_cursor(chat_messages[-1])
+    chat_messages.reverse()
+    return chat_messages, older_cursor
+
+def message_summary(message):
+    """Inbox summary of a message: its time, sender and the start of its content"""
+    return {
+        'timestamp': message['timestamp'],
+        'sender_id': message['sender_id'],
+        'preview': message['content'][:app.config.get('MESSAGE_PREVIEW_LENGTH', 100)]
+    }
+
+def last_message_update(conversation_id, summary):
+    """Update storing a conversation's inbox summary unless a newer message's is already there.
+
+    The filter compares the scalar timestamps, so racing sends and backfills
+    keep the summary of the newest message (the first one stored on a tie).
+    """
+    return UpdateOne(
+        {'_id': conversation_id, '$or': [
+            {'last_message': {'$exists': False}},
+            {'last_message.timestamp': {'$lt': summary['timestamp']}}
+        ]},
+        {'$set': {'last_message': summary}}
+    )
+
+def message_json(message):
+    """Message fields sent to the chat page"""
+    return {
+        '_id': str(message['_id']),
+        'sender_id': str(message['sender_id']),
+        'receiver_id': str(message['receiver_id']),
+        'content': message['content'],
+        'timestamp': message['timestamp'].strftime('%H:%M')
+    }
+
+def mark_conversation_read(reader_id, other_id, through=None):
+    """Mark the messages a user received in a conversation read, up to and including ``through`` when given"""
+    query = conversation_query(reader_id, other_id, through=through)
+    query.update({'receiver_id': ObjectId(reader_id), 'is_read': False})
+    result = mongo.db.messages.update_many(query, {'$set': {'is_read': True}})
+    
+    # Only messages this call flipped are taken off the counter, so overlapping receipts never double count
+    if result.modified_count:
+        mongo.db.matches.update_one(
+            {'_id': match_pair_id(reader_id, other_id)},
+            {'$inc': {f'unread.{reader_id}': -result.modified_count}}
+        )
+    return result.modified_count
 
 @app.route('/chat/<user_id>')
 @login_required
@@ -1193,38 +1606,20 @@ def chat(user_id):
         other_user = User(other_user_data)
         
         # Check if they are matched
-        is_matched = mongo.db.likes.find_one({
-            '$or': [
-                {
-                    'liker_id': ObjectId(current_user.id),
-                    'liked_id': ObjectId(user_id)
-                },
-                {
-                    'liker_id': ObjectId(user_id),
-                    'liked_id': ObjectId(current_user.id)
-                }
-            ]
-        })
-        
-        if not is_matched:
+        if not is_mutual_match(current_user.id, user_id):
             flash('You can only chat with matched users!', 'error')
             return redirect(url_for('matches'))
         
-        # Get messages between these users
-        chat_messages = list(mongo.db.messages.find({
-            '$or': [
-                {
-                    'sender_id': ObjectId(current_user.id),
-                    'receiver_id': ObjectId(user_id)
-                },
-                {
-                    'sender_id': ObjectId(user_id),
-                    'receiver_id': ObjectId(current_user.id)
-                }
-            ]
-        }).sort('timestamp', 1))
+        # Get the newest page of messages between these users; older ones load on scroll
+        chat_messages, history_cursor = conversation_page(current_user.id, user_id)
+        
+        # Messages shown now count as read
+        if chat_messages:
+            mark_conversation_read(current_user.id, user_id, message_position(chat_messages[-1]))
         
-        return render_template('chat.html', other_user=other_user, messages=chat_messages)
+        return render_template('chat.html', other_user=other_user, messages=chat_messages,
+                               messages_cursor=message_cursor(chat_messages[-1]) if chat_messages else '',
+                               history_cursor=history_cursor or '')
     except Exception as e:
         flash(f'Error loading chat: {str(e)}', 'error')
         return redirect(url_for('matches'))
@@ -1240,24 +1635,12 @@ def send_message():
             return jsonify({'success': False, 'message': 'Message cannot be empty!'})
         
         # Check if they are matched
-        is_matched = mongo.db.likes.find_one({
-            '$or': [
-                {
-                    'liker_id': ObjectId(current_user.id),
-                    'liked_id': ObjectId(receiver_id)
-                },
-                {
-                    'liker_id': ObjectId(receiver_id),
-                    'liked_id': ObjectId(current_user.id)
-                }
-            ]
-        })
-        
-        if not is_matched:
+        if not is_mutual_match(current_user.id, receiver_id):
             return jsonify({'success': False, 'message': 'You can only message matched users!'})
         
         # Create message in MongoDB Atlas
         message_data = {
+            'conversation_id': match_pair_id(current_user.id, receiver_id),
             'sender_id': ObjectId(current_user.id),
             'receiver_id': ObjectId(receiver_id),
             'content': content,
@@ -1267,6 +1650,27 @@ def send_message():
         
         result = mongo.db.messages.insert_one(message_data)
         
+        # New version of the conversation for conditional polls, one more unread message for the
+        # receiver, and the inbox summary; $max and the summary's filter keep the newest when sends race
+        mongo.db.matches.bulk_write([
+            UpdateOne(
+                {'_id': message_data['conversation_id']},
+                {
+                    '$inc': {'version': 1, f'unread.{receiver_id}': 1},
+                    '$max': {'last_activity': message_data['timestamp']}
+                }
+            ),
+            last_message_update(message_data['conversation_id'], message_summary(message_data))
+        ], ordered=False)
+        
+        # Push the message to both users' open chat streams
+        try:
+            event = {'message': message_json(dict(message_data, _id=result.inserted_id))}
+            for channel_user_id in {receiver_id, current_user.id}:
+                broker.publish(f"user:{channel_user_id}", event)
+        except Exception as e:
+            print(f"Error publishing message event: {e}")
+        
         return jsonify({
             'success': True,
             'message': 'Message sent successfully!',
@@ -1276,95 +1680,197 @@ def send_message():
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+@app.route('/mark_messages_read/<user_id>', methods=['POST'])
+@login_required
+def mark_messages_read(user_id):
+    """Read receipt: mark received messages read up to a message (all of them without one)"""
+    try:
+        if not is_mutual_match(current_user.id, user_id):
+            return jsonify({'success': False, 'message': 'You can only read messages from matched users!'})
+        
+        through = None
+        through_id = (request.get_json(silent=True) or {}).get('through') or request.form.get('through')
+        if through_id:
+            message = mongo.db.messages.find_one(
+                {'_id': ObjectId(through_id), 'conversation_id': match_pair_id(current_user.id, user_id)},
+                {'timestamp': 1}
+            )
+            if not message:
+                return jsonify({'success': False, 'message': 'Message not found!'})
+            through = message_position(message)
+        
+        return jsonify({'success': True, 'marked': mark_conversation_read(current_user.id, user_id, through)})
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@app.route('/chat_stream/<user_id>')
+@login_required
+def chat_stream(user_id):
+    """Push new messages between current user and another user as Server-Sent Events"""
+    if not is_mutual_match(current_user.id, user_id):
+        return jsonify({'success': False, 'message': 'You can only view messages with matched users!'}), 403
+    
+    # Refuse the stream when all slots are taken; the chat page then falls back to polling
+    if stream_slots is None or not stream_slots.acquire(blocking=False):
+        return jsonify({'success': False, 'message': 'Live updates are busy, polling instead'}), 503
+    
+    channel = f"user:{current_user.id}"
+    seconds = app.config.get('REALTIME_STREAM_SECONDS', 55)
+    
+    def generate():
+        # Streams end after a while so workers are freed; the browser then reconnects
+        yield 'retry: 1000\n\n'
+        for event in broker.listen(channel, seconds):
+            if event is None:
+                yield ': keep-alive\n\n'
+            elif user_id in (event['message']['sender_id'], event['message']['receiver_id']):
+                yield f"data: {json.dumps(event)}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    # Free the slot when the server closes the response, even if the stream never started
+    response.call_on_close(stream_slots.release)
+    return response
+
 @app.route('/get_messages/<user_id>')
 @login_required
 def get_messages(user_id):
     """Get messages between current user and another user for real-time updates"""
     try:
-        # Check if they are matched
-        is_matched = mongo.db.likes.find_one({
-            '$or': [
-                {
-                    'liker_id': ObjectId(current_user.id),
-                    'liked_id': ObjectId(user_id)
-                },
-                {
-                    'liker_id': ObjectId(user_id),
-                    'liked_id': ObjectId(current_user.id)
-                }
-            ]
-        })
-        
-        if not is_matched:
+        # Check if they are matched, reading the conversation version at the same time
+        match = mongo.db.matches.find_one({'_id': match_pair_id(current_user.id, user_id)}, {'version': 1})
+        if not match:
             return jsonify({'success': False, 'message': 'You can only view messages with matched users!'})
         
-        # Get messages between these users
-        chat_messages = list(mongo.db.messages.find({
-            '$or': [
-                {
-                    'sender_id': ObjectId(current_user.id),
-                    'receiver_id': ObjectId(user_id)
-                },
-                {
-                    'sender_id': ObjectId(user_id),
-                    'receiver_id': ObjectId(current_user.id)
-                }
-            ]
-        }).sort('timestamp', 1))
+        def build():
+            # Get messages after the client's cursor, or the newest page without one
+            since = serializer.loads(request.args['since'], salt='messages-cursor') if request.args.get('since') else None
+            if since:
+                # A message stamped just before the cursor may commit after it was handed out, so overlap a short window
+                lookback = app.config.get('MESSAGE_POLL_LOOKBACK', timedelta(seconds=5))
+                since = [since[0] - lookback // timedelta(milliseconds=1), since[1]]
+                chat_messages = list(
+                    mongo.db.messages.find(conversation_query(current_user.id, user_id, since=since))
+                    .sort([('timestamp', 1), ('_id', 1)])
+                )
+            else:
+                chat_messages, _ = conversation_page(current_user.id, user_id)
+            cursor = message_cursor(chat_messages[-1]) if chat_messages else request.args.get('since', '')
+            
+            return jsonify({
+                'success': True,
+                'messages': [message_json(msg) for msg in chat_messages],
+                'cursor': cursor
+            })
         
-        # Convert ObjectId to string for JSON serialization
-        for msg in chat_messages:
-            msg['_id'] = str(msg['_id'])
-            msg['sender_id'] = str(msg['sender_id'])
-            msg['receiver_id'] = str(msg['receiver_id'])
-            msg['timestamp'] = msg['timestamp'].strftime('%H:%M')
+        return conditional_json(f"c-{match['_id']}-{match.get('version', 0)}", build)
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
+
+@app.route('/chat_history/<user_id>')
+@login_required
+def chat_history(user_id):
+    """Get the page of messages before a cursor, for scrolling back through a chat"""
+    try:
+        if not is_mutual_match(current_user.id, user_id):
+            return jsonify({'success': False, 'message': 'You can only view messages with matched users!'})
+        
+        before = serializer.loads(request.args['before'], salt='messages-cursor')
+        chat_messages, older_cursor = conversation_page(current_user.id, user_id, before)
         
         return jsonify({
             'success': True,
-            'messages': chat_messages
+            'messages': [message_json(msg) for msg in chat_messages],
+            'before': older_cursor
         })
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+def bump_notifications_version(user_ids, unread=0):
+    """Mark the notifications of these users as changed, adding ``unread`` to their unread counters"""
+    update = {'notifications_version': 1}
+    if unread:
+        update['unread_notifications'] = unread
+    mongo.db.users.update_many({'_id': {'$in': [ObjectId(user_id) for user_id in user_ids]}}, {'$inc': update})
+
+def update_unread_notifications(unread):
+    """Add ``unread`` to the current user's unread counter, returning the new count"""
+    user_data = mongo.db.users.find_one_and_update(
+        {'_id': ObjectId(current_user.id)},
+        {'$inc': {'notifications_version': 1, 'unread_notifications': unread}},
+        projection={'unread_notifications': 1},
+        return_document=ReturnDocument.AFTER
+    )
+    current_user.unread_notifications = max(user_data.get('unread_notifications', 0), 0)
+    return current_user.unread_notifications
+
+def refresh_liker_snapshots(user):
+    """Copy a user's current name and picture into the notifications of their likes"""
+    mongo.db.notifications.update_many(
+        {'liker_id': ObjectId(user.id)},
+        {'$set': {'liker_name': f"{user.first_name} {user.last_name}", 'liker_picture': user.profile_picture or ''}}
+    )
+    bump_notifications_version(mongo.db.notifications.distinct('receiver_id', {'liker_id': ObjectId(user.id)}))
+
+def conditional_json(version, build):
+    """Answer 304 if the client already has this version, else the JSON response from build()"""
+    # The query string is part of the tag, so each cursor or page is cached separately
+    etag = f"{version}-{zlib.crc32(request.query_string):08x}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = build()
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/get_notifications')
 @login_required
 def get_notifications():
     try:
-        # Get notifications for current user
-        notifications = list(mongo.db.notifications.find({
-            'receiver_id': ObjectId(current_user.id)
-        }).sort('timestamp', -1).limit(10))
-        
-        # Format notifications
-        formatted_notifications = []
-        for notif in notifications:
-            # Get liker's info
-            liker_data = mongo.db.users.find_one({'_id': notif['liker_id']})
-            if liker_data:
+        def build():
+            # Get the newest notifications for current user
+            notifications = list(mongo.db.notifications.find({
+                'receiver_id': ObjectId(current_user.id)
+            }).sort('timestamp', -1).limit(10))
+            
+            # Notifications saved before likers were snapshotted get their liker's info in one batch
+            legacy_ids = [notif['liker_id'] for notif in notifications if 'liker_name' not in notif]
+            legacy_likers = {
+                liker_data['_id']: liker_data
+                for liker_data in mongo.db.users.find(
+                    {'_id': {'$in': legacy_ids}}, {'first_name': 1, 'last_name': 1, 'profile_picture': 1}
+                )
+            } if legacy_ids else {}
+            
+            # Format notifications
+            formatted_notifications = []
+            for notif in notifications:
+                if 'liker_name' not in notif:
+                    liker_data = legacy_likers.get(notif['liker_id'])
+                    if not liker_data:
+                        continue
+                    notif['liker_name'] = f"{liker_data.get('first_name', '')} {liker_data.get('last_name', '')}"
+                    notif['liker_picture'] = liker_data.get('profile_picture', '')
                 formatted_notifications.append({
                     'id': str(notif['_id']),
                     'liker_id': str(notif['liker_id']),
-                    'liker_name': f"{liker_data.get('first_name', '')} {liker_data.get('last_name', '')}",
-                    'liker_picture': liker_data.get('profile_picture', ''),
+                    'liker_name': notif['liker_name'],
+                    'liker_picture': notif.get('liker_picture', ''),
                     'message': notif['message'],
                     'timestamp': notif['timestamp'].isoformat(),
                     'is_read': notif.get('is_read', False)
                 })
+            
+            # The unread count is kept on the user document load_user already read
+            return jsonify({
+                'success': True,
+                'notifications': formatted_notifications,
+                'unread_count': max(current_user.unread_notifications, 0)
+            })
         
-        # Update unread count
-        unread_count = mongo.db.notifications.count_documents({
-            'receiver_id': ObjectId(current_user.id),
-            'is_read': False
-        })
-        
-        # Update current user object
-        current_user.unread_notifications = unread_count
-        
-        return jsonify({
-            'success': True,
-            'notifications': formatted_notifications,
-            'unread_count': unread_count
-        })
+        # Unchanged notifications are answered from the user document load_user already read
+        return conditional_json(f"n-{current_user.id}-{current_user.notifications_version}", build)
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
@@ -1374,19 +1880,13 @@ def get_notifications():
 def mark_notification_read(notification_id):
     try:
         # Mark notification as read
-        mongo.db.notifications.update_one(
-            {'_id': ObjectId(notification_id), 'receiver_id': ObjectId(current_user.id)},
+        result = mongo.db.notifications.update_one(
+            {'_id': ObjectId(notification_id), 'receiver_id': ObjectId(current_user.id), 'is_read': False},
             {'$set': {'is_read': True}}
         )
         
-        # Update unread count
-        unread_count = mongo.db.notifications.count_documents({
-            'receiver_id': ObjectId(current_user.id),
-            'is_read': False
-        })
-        
-        # Update current user object
-        current_user.unread_notifications = unread_count
+        # Update unread count (unchanged if it was already read)
+        unread_count = update_unread_notifications(-result.modified_count)
         
         return jsonify({'success': True, 'unread_count': unread_count})
         
@@ -1398,20 +1898,14 @@ def mark_notification_read(notification_id):
 def delete_notification(notification_id):
     try:
         # Delete notification
-        result = mongo.db.notifications.delete_one({
-            '_id': ObjectId(notification_id), 
-            'receiver_id': ObjectId(current_user.id)
-        })
+        notification = mongo.db.notifications.find_one_and_delete(
+            {'_id': ObjectId(notification_id), 'receiver_id': ObjectId(current_user.id)},
+            projection={'is_read': 1}
+        )
         
-        if result.deleted_count > 0:
+        if notification:
             # Update unread count
-            unread_count = mongo.db.notifications.count_documents({
-                'receiver_id': ObjectId(current_user.id),
-                'is_read': False
-            })
-            
-            # Update current user object
-            current_user.unread_notifications = unread_count
+            unread_count = update_unread_notifications(0 if notification.get('is_read') else -1)
             
             return jsonify({'success': True, 'unread_count': unread_count})
         else:
@@ -1430,8 +1924,8 @@ def mark_all_notifications_read():
             {'$set': {'is_read': True}}
         )
         
-        # Update current user object
-        current_user.unread_notifications = 0
+        # Update unread count
+        update_unread_notifications(-result.modified_count)
         
         return jsonify({'success': True, 'updated_count': result.modified_count})
         
@@ -1442,13 +1936,20 @@ def mark_all_notifications_read():
 @login_required
 def clear_all_notifications():
     try:
-        # Delete all notifications for the user
+        # Mark unread notifications read first, so the counter drops by exactly those deleted
+        marked = mongo.db.notifications.update_many(
+            {'receiver_id': ObjectId(current_user.id), 'is_read': False},
+            {'$set': {'is_read': True}}
+        )
+        
+        # Delete all notifications for the user (one arriving meanwhile stays, unread)
         result = mongo.db.notifications.delete_many({
-            'receiver_id': ObjectId(current_user.id)
+            'receiver_id': ObjectId(current_user.id),
+            'is_read': True
         })
         
-        # Update current user object
-        current_user.unread_notifications = 0
+        # Update unread count
+        update_unread_notifications(-marked.modified_count)
         
         return jsonify({'success': True, 'deleted_count': result.deleted_count})
         
@@ -1494,8 +1995,29 @@ def delete_profile():
         # 4. Delete all notifications where user is receiver
         mongo.db.notifications.delete_many({'receiver_id': user_id})
         
-        # 5. Delete all notifications where user is liker (for likes they sent)
+        # 5. Delete all notifications where user is liker (for likes they sent),
+        # taking the unread ones off their receivers' counters
+        receivers = list(mongo.db.notifications.aggregate([
+            {'$match': {'liker_id': user_id}},
+            {'$group': {'_id': '$receiver_id', 'unread': {'$sum': {'$cond': ['$is_read', 0, 1]}}}}
+        ]))
         mongo.db.notifications.delete_many({'liker_id': user_id})
+        if receivers:
+            mongo.db.users.bulk_write([
+                UpdateOne({'_id': receiver['_id']}, {'$inc': {
+                    'notifications_version': 1,
+                    'unread_notifications': -receiver['unread']
+                }})
+                for receiver in receivers
+            ], ordered=False)
+        
+        # 6. Delete stored recommendations for and pointing at the user
+        remove_from_recommendations(user_id)
+        
+        # 7. Delete all mutual matches the user is part of
+        match_ids = [match['_id'] for match in mongo.db.matches.find({'users': user_id}, {'_id': 1})]
+        mongo.db.matches.delete_many({'_id': {'$in': match_ids}})
+        forget_matches(match_ids)
         
         # Logout user
         logout_user()
@@ -1507,6 +2029,125 @@ def delete_profile():
         flash(f'Error deleting profile: {str(e)}', 'error')
         return redirect(url_for('profile', user_id=current_user.id))
 
+@app.cli.command('backfill-profile-features')
+def backfill_profile_features():
+    """Intern tags and sign bios for profiles saved before those fields existed"""
+    updated = 0
+    for user_data in mongo.db.users.find(
+            {'$or': [{'interest_ids': {'$exists': False}}, {'bio_signature': {'$exists': False}}]},
+            {'interests': 1, 'study_habits': 1, 'life_goals': 1, 'bio': 1}):
+        mongo.db.users.update_one(
+            {'_id': user_data['_id']},
+            {'$set': {
+                'interest_ids': intern_tags(user_data.get('interests', [])),
+                'habit_ids': intern_tags(user_data.get('study_habits', [])),
+                'goal_ids': intern_tags(user_data.get('life_goals', [])),
+                'bio_signature': bio_signature(user_data.get('bio', ''))
+            }}
+        )
+        updated += 1
+    print(f"✅ Backfilled tags and bio signatures for {updated} profiles")
+
+@app.cli.command('backfill-matches')
+def backfill_matches():
+    """Record mutual matches for reciprocal likes made before the matches collection existed"""
+    liked_at = {}
+    for like in mongo.db.likes.find({}, {'liker_id': 1, 'liked_id': 1, 'timestamp': 1}):
+        liked_at[(like['liker_id'], like['liked_id'])] = like.get('timestamp')
+    
+    recorded = 0
+    for (liker_id, liked_id), timestamp in liked_at.items():
+        # Each reciprocal pair appears twice; record it from its lower user only
+        if str(liker_id) < str(liked_id) and (liked_id, liker_id) in liked_at:
+            timestamps = [t for t in (timestamp, liked_at[(liked_id, liker_id)]) if t]
+            record_match(liker_id, liked_id, max(timestamps) if timestamps else None)
+            recorded += 1
+    print(f"✅ Recorded {recorded} mutual matches")
+
+@app.cli.command('backfill-conversation-ids')
+def backfill_conversation_ids():
+    """Key messages saved before conversation IDs existed by their conversation"""
+    pairs = mongo.db.messages.aggregate([
+        {'$match': {'conversation_id': {'$exists': False}}},
+        {'$group': {'_id': {'sender_id': '$sender_id', 'receiver_id': '$receiver_id'}}}
+    ])
+    updates = [
+        UpdateMany(
+            {'sender_id': pair['_id']['sender_id'], 'receiver_id': pair['_id']['receiver_id'],
+             'conversation_id': {'$exists': False}},
+            {'$set': {'conversation_id': match_pair_id(pair['_id']['sender_id'], pair['_id']['receiver_id'])}}
+        )
+        for pair in pairs
+    ]
+    updated = 0
+    for start in range(0, len(updates), 500):
+        updated += mongo.db.messages.bulk_write(updates[start:start + 500], ordered=False).modified_count
+    print(f"✅ Added conversation IDs to {updated} messages")
+
+@app.cli.command('reconcile-notification-counts')
+def reconcile_notification_counts():
+    """Recount every user's unread notifications, fixing counter drift (safe to run periodically)"""
+    unread_by_user = {
+        group['_id']: group['count']
+        for group in mongo.db.notifications.aggregate([
+            {'$match': {'is_read': False}},
+            {'$group': {'_id': '$receiver_id', 'count': {'$sum': 1}}}
+        ])
+    }
+    updates = [
+        UpdateOne({'_id': user_data['_id']}, {
+            '$set': {'unread_notifications': unread_by_user.get(user_data['_id'], 0)},
+            '$inc': {'notifications_version': 1}
+        })
+        for user_data in mongo.db.users.find({}, {'unread_notifications': 1})
+        if user_data.get('unread_notifications') != unread_by_user.get(user_data['_id'], 0)
+    ]
+    for start in range(0, len(updates), 500):
+        mongo.db.users.bulk_write(updates[start:start + 500], ordered=False)
+    print(f"✅ Corrected unread notification counts of {len(updates)} users")
+
+@app.cli.command('backfill-unread-counts')
+def backfill_unread_counts():
+    """Recount the unread messages of every conversation into its match document"""
+    counts = {}
+    for group in mongo.db.messages.aggregate([
+        {'$match': {'is_read': False, 'conversation_id': {'$exists': True}}},
+        {'$group': {'_id': {'conversation_id': '$conversation_id', 'receiver_id': '$receiver_id'}, 'count': {'$sum': 1}}}
+    ]):
+        unread = counts.setdefault(group['_id']['conversation_id'], {})
+        unread[str(group['_id']['receiver_id'])] = group['count']
+    
+    # Conversations without unread messages are reset to empty counters
+    updates = [
+        UpdateOne({'_id': match['_id']}, {'$set': {'unread': counts.get(match['_id'], {})}})
+        for match in mongo.db.matches.find({}, {'_id': 1})
+    ]
+    for start in range(0, len(updates), 500):
+        mongo.db.matches.bulk_write(updates[start:start + 500], ordered=False)
+    print(f"✅ Recounted unread messages of {len(updates)} conversations")
+
+@app.cli.command('backfill-inbox')
+def backfill_inbox():
+    """Summarize the last message of every conversation into its match document"""
+    last_messages = mongo.db.messages.aggregate([
+        {'$match': {'conversation_id': {'$exists': True}}},
+        {'$sort': {'conversation_id': 1, 'timestamp': -1, '_id': -1}},
+        {'$group': {'_id': '$conversation_id', 'message': {'$first': '$$ROOT'}}}
+    ])
+    updates = []
+    for group in last_messages:
+        updates.append(UpdateOne({'_id': group['_id']}, {'$max': {'last_activity': group['message']['timestamp']}}))
+        updates.append(last_message_update(group['_id'], message_summary(group['message'])))
+    for start in range(0, len(updates), 500):
+        mongo.db.matches.bulk_write(updates[start:start + 500], ordered=False)
+    
+    # Matches without messages are ordered by when they formed
+    untouched = mongo.db.matches.update_many(
+        {'last_activity': {'$exists': False}},
+        [{'$set': {'last_activity': '$created_at'}}]
+    )
+    print(f"✅ Summarized {len(updates) // 2} conversations, {untouched.modified_count} matches without messages")
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -0,0 +1,181 @@
+"""Offline all-pairs matching job.
+
+Computes the ranked dashboard and suggestion lists for every user (or every
+user of one institute) and writes them to the recommendations collection the
+web app reads, so scoring happens off the request path. Run it every
+MATCH_JOB_INTERVAL (nightly) or after a large onboarding wave; the web app
+keeps the lists for RECOMMENDATIONS_TTL, which outlasts that interval:
+
+    python match_job.py --institute "IIT Madras" --processes 4
+    python match_job.py --institute "IIT Madras" --resume
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timezone
+from multiprocessing import Pool
+
+import numpy as np
+from bson import ObjectId
+from pymongo import MongoClient, ReplaceOne
+
+from config import config
+from matching import SCORING_FIELDS, CandidateFeatures, CandidateProfile, profile_completeness, score_candidates
+
+# Population shared by every worker process, set once by _init_worker
+_population = None
+_features = None
+_genders = None
+_interested_in = None
+_ids = None
+_completeness = None
+
+
+def _init_worker(population):
+    """Keep the candidate population, its scoring features and filter columns in the worker"""
+    global _population, _features, _genders, _interested_in, _ids, _completeness
+    _population = population
+    _features = CandidateFeatures(population)
+    _genders = np.array([profile.gender for profile in population], dtype=object)
+    _interested_in = np.array([profile.interested_in for profile in population], dtype=object)
+    _ids = np.array([profile.id for profile in population], dtype=object)
+    _completeness = np.array([profile_completeness(profile) for profile in population], dtype=np.int64)
+
+
+def _top_entries(indices, scores, limit):
+    """Pick the top-K candidates by (score, completeness, id), highest first"""
+    if not len(indices):
+        return []
+    # Completeness is 0-4, so this folds the first two sort keys into one number
+    combined = scores[indices] * 5 + _completeness[indices]
+    if len(indices) > limit:
+        threshold = np.partition(combined, len(combined) - limit)[len(combined) - limit]
+        indices = indices[combined >= threshold]
+    ranked = sorted(indices, key=lambda i: (scores[i], _completeness[i], _ids[i]), reverse=True)[:limit]
+    return [
+        {'user_id': _ids[i], 'score': int(scores[i]), 'completeness': int(_completeness[i])}
+        for i in ranked
+    ]
+
+
+def rank_chunk(chunk):
+    """Rank the whole population for a chunk of (owner index, liked user IDs) pairs"""
+    owner_indices, liked_by_owner, limit = chunk
+    results = []
+    for owner_index, liked_ids in zip(owner_indices, liked_by_owner):
+        owner = _population[owner_index]
+        scores = score_candidates(owner, _features)
+        others = _ids != owner.id
+
+        # Dashboard: preferred gender, falling back to everyone else
+        preferred = np.flatnonzero(others & (_genders == owner.interested_in) & (_interested_in == owner.gender))
+        dashboard_fallback = not len(preferred)
+        dashboard = _top_entries(np.flatnonzero(others) if dashboard_fallback else preferred, scores, limit)
+
+        # Suggestions: not yet liked and at least 30% compatible
+        not_liked = ~np.isin(_ids, list(liked_ids)) if liked_ids else np.ones(len(_ids), dtype=bool)
+        suggestions = _top_entries(np.flatnonzero(others & not_liked & (scores >= 30)), scores, limit)
+
+        results.append((owner.id, dashboard_fallback, dashboard, suggestions))
+    return results, len(owner_indices) * (len(_population) - 1)
+
+
+def run_job(db, institute=None, processes=None, chunk_size=50, limit=100, resume=False):
+    """Compute and store recommendations for every user, reporting throughput"""
+    # Start a new job, or pick up the last unfinished one for the same institute
+    job = None
+    if resume:
+        job = db.match_jobs.find_one({'institute': institute, 'finished_at': None}, sort=[('started_at', -1)])
+    if job:
+        print(f"↻ Resuming job started at {job['started_at']}")
+    else:
+        job = {'institute': institute, 'started_at': datetime.now(timezone.utc), 'finished_at': None}
+        job['_id'] = db.match_jobs.insert_one(job).inserted_id
+
+    population = [CandidateProfile(user_data) for user_data in db.users.find({}, SCORING_FIELDS)]
+    position = {profile.id: index for index, profile in enumerate(population)}
+
+    owner_filter = {'institute': institute} if institute else {}
+    owner_ids = [user_data['_id'] for user_data in db.users.find(owner_filter, {'_id': 1})]
+    if resume:
+        # Skip users whose recommendations were already written by this job
+        done = set(
+            recommendations['_id']
+            for recommendations in db.recommendations.find(
+                {'_id': {'$in': owner_ids}, 'computed_at': {'$gte': job['started_at']}},
+                {'_id': 1}
+            )
+        )
+        owner_ids = [owner_id for owner_id in owner_ids if owner_id not in done]
+
+    liked = {}
+    for like in db.likes.find({'liker_id': {'$in': owner_ids}}, {'liker_id': 1, 'liked_id': 1}):
+        liked.setdefault(like['liker_id'], set()).add(str(like['liked_id']))
+
+    chunks = []
+    for start in range(0, len(owner_ids), chunk_size):
+        chunk_ids = owner_ids[start:start + chunk_size]
+        chunks.append((
+            [position[str(owner_id)] for owner_id in chunk_ids],
+            [liked.get(owner_id, set()) for owner_id in chunk_ids],
+            limit
+        ))
+
+    print(f"🔄 Ranking {len(owner_ids)} users against {len(population)} candidates")
+    started = time.perf_counter()
+    total_pairs = 0
+    ranked_users = 0
+    with Pool(processes, initializer=_init_worker, initargs=(population,)) as pool:
+        for results, pairs in pool.imap_unordered(rank_chunk, chunks):
+            computed_at = datetime.now(timezone.utc)
+            db.recommendations.bulk_write([
+                ReplaceOne(
+                    {'_id': ObjectId(owner_id)},
+                    {
+                        'gender': population[position[owner_id]].gender,
+                        'interested_in': population[position[owner_id]].interested_in,
+                        'dashboard_fallback': dashboard_fallback,
+                        'dashboard_truncated': len(dashboard) >= limit,
+                        'dashboard': [dict(entry, user_id=ObjectId(entry['user_id'])) for entry in dashboard],
+                        'suggestions': [dict(entry, user_id=ObjectId(entry['user_id'])) for entry in suggestions],
+                        'computed_at': computed_at
+                    },
+                    upsert=True
+                )
+                for owner_id, dashboard_fallback, dashboard, suggestions in results
+            ], ordered=False)
+
+            total_pairs += pairs
+            ranked_users += len(results)
+            elapsed = time.perf_counter() - started
+            print(f"   {ranked_users}/{len(owner_ids)} users, {total_pairs / max(elapsed, 1e-9):,.0f} pairs/s")
+
+    elapsed = time.perf_counter() - started
+    db.match_jobs.update_one({'_id': job['_id']}, {'$set': {
+        'finished_at': datetime.now(timezone.utc),
+        'users': ranked_users,
+        'pairs': total_pairs,
+        'seconds': elapsed
+    }})
+    print(f"✅ Ranked {ranked_users} users ({total_pairs:,} pairs) in {elapsed:.1f}s "
+          f"- {total_pairs / max(elapsed, 1e-9):,.0f} pairs/s")
+    return total_pairs, elapsed
+
+
+def main():
+    app_config = config[os.environ.get('FLASK_ENV', 'default')]
+    parser = argparse.ArgumentParser(description='Precompute match recommendations for every user')
+    parser.add_argument('--institute', help='Only rank users of this institute')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=50, help='Users per unit of work')
+    parser.add_argument('--limit', type=int, default=app_config.RECOMMENDATIONS_LIMIT, help='Ranked candidates stored per user')
+    parser.add_argument('--resume', action='store_true', help='Continue the last unfinished job')
+    parser.add_argument('--mongo-uri', default=app_config.MONGO_URI, help='MongoDB connection string')
+    args = parser.parse_args()
+
+    db = MongoClient(args.mongo_uri).get_default_database()
+    run_job(db, args.institute, args.processes, args.chunk_size, args.limit, args.resume)
+
+
+if __name__ == '__main__':
+    main()
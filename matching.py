@@ -0,0 +1,572 @@
+"""Compatibility scoring for Institute Dating matches"""
+import heapq
+import zlib
+from itertools import chain
+
+import numpy as np
+from bson import ObjectId
+
+# Similar fields get partial points in course compatibility
+SIMILAR_COURSES = {
+    '(B.Tech)': ['(M.Tech)', '(B.S)'],
+    '(M.Tech)': ['(B.Tech)', '(Ph.D)'],
+    '(B.S)': ['(B.Tech)', '(M.Sc)'],
+    '(M.Sc)': ['(B.S)', '(Ph.D)'],
+    '(MBA)': ['(B.Tech)', '(M.Tech)'],
+    '(Ph.D)': ['(M.Tech)', '(M.Sc)'],
+    'Humanities': ['(B.S)', '(M.Sc)'],
+    'OTHERs': ['(B.Tech)', '(M.Sc)', 'Humanities']
+}
+
+COMPATIBLE_PERSONALITIES = [
+    ('Introvert', 'Extrovert'),
+    ('Analytical', 'Creative'),
+    ('Adventurous', 'Cautious')
+]
+
+
+# Common words that say nothing about compatibility when two bios share them
+STOPWORDS = frozenset("""
+a about above after again all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers herself him himself his how i i'm if in into is it it's its itself just me more most my myself no nor
+not now of off on once only or other our ours ourselves out over own same she should so some such than
+that the their theirs them themselves then there these they this those through to too under until up
+very was we were what when where which while who whom why will with would you your yours yourself
+yourselves
+""".split())
+
+
+def bio_tokens(bio):
+    """Split a bio into lowercase words, leaving out stopwords"""
+    return set(bio.lower().split()) - STOPWORDS if bio else set()
+
+
+def bio_signature(bio):
+    """Hash a bio's tokens once so bios can be compared without re-tokenizing"""
+    return sorted(set(zlib.crc32(token.encode('utf-8')) for token in bio_tokens(bio)))
+
+
+def _bio_feature(profile):
+    """Return a profile's bio signature as a set, computing it for older profiles"""
+    signature = getattr(profile, 'bio_signature', None)
+    if signature is None:
+        signature = bio_signature(profile.bio)
+    return frozenset(signature)
+
+
+def normalize_tag(tag):
+    """Normalize an interest, study habit or life goal for comparison"""
+    return tag.strip().lower()
+
+
+def _common_tag_count(tags1, ids1, tags2, ids2):
+    """Count shared tags, comparing interned tag IDs when both profiles have them"""
+    if ids1 is not None and ids2 is not None:
+        return len(ids1 & ids2)
+    return len(set(normalize_tag(tag) for tag in tags1) & set(normalize_tag(tag) for tag in tags2))
+
+
+# Fields needed to score a candidate
+SCORING_FIELDS = [
+    'gender', 'interested_in', 'course', 'year', 'bio', 'location',
+    'interests', 'study_habits', 'life_goals', 'personality_type',
+    'interest_ids', 'habit_ids', 'goal_ids', 'bio_signature'
+]
+
+# Fields needed to score a candidate and render its match card
+CARD_FIELDS = SCORING_FIELDS + ['first_name', 'last_name', 'age', 'institute', 'profile_picture']
+
+
+class CandidateProfile:
+    """Lightweight candidate built from a projected user document.
+
+    Holds only what scoring and the match cards need, so ranking thousands of
+    candidates avoids building full User objects (password hash included).
+    """
+    __slots__ = (
+        'id', 'first_name', 'last_name', 'age', 'gender', 'interested_in', 'institute', 'course', 'year',
+        'bio', 'location', 'profile_picture', 'interests', 'study_habits', 'life_goals',
+        'personality_type', 'interest_ids', 'habit_ids', 'goal_ids', 'bio_signature',
+        'compatibility_score'
+    )
+
+    def __init__(self, user_data):
+        self.id = str(user_data['_id'])
+        self.first_name = user_data.get('first_name', '')
+        self.last_name = user_data.get('last_name', '')
+        self.age = user_data.get('age')
+        self.gender = user_data.get('gender', '')
+        self.interested_in = user_data.get('interested_in', '')
+        self.institute = user_data.get('institute', '')
+        self.course = user_data.get('course', '')
+        self.year = user_data.get('year', 0)
+        self.bio = user_data.get('bio', '')
+        self.location = user_data.get('location', '')
+        self.profile_picture = user_data.get('profile_picture', '')
+        self.interests = user_data.get('interests', [])
+        self.study_habits = user_data.get('study_habits', [])
+        self.life_goals = user_data.get('life_goals', [])
+        self.personality_type = user_data.get('personality_type', '')
+        # Interned tag IDs and bio signature (None for profiles saved before they existed)
+        self.interest_ids = frozenset(user_data['interest_ids']) if 'interest_ids' in user_data else None
+        self.habit_ids = frozenset(user_data['habit_ids']) if 'habit_ids' in user_data else None
+        self.goal_ids = frozenset(user_data['goal_ids']) if 'goal_ids' in user_data else None
+        self.bio_signature = frozenset(user_data['bio_signature']) if 'bio_signature' in user_data else None
+        self.compatibility_score = 0
+
+
+def calculate_compatibility(user1, user2):
+    """Calculate compatibility score between two users"""
+    score = 0
+
+    # Interest matching (35 points) - Increased importance
+    if user1.interests and user2.interests:
+        common_interests = _common_tag_count(user1.interests, getattr(user1, 'interest_ids', None),
+                                             user2.interests, getattr(user2, 'interest_ids', None))
+        if common_interests:
+            score += min(common_interests * 12, 35)
+
+    # Study habits compatibility (25 points) - Increased importance
+    if user1.study_habits and user2.study_habits:
+        common_habits = _common_tag_count(user1.study_habits, getattr(user1, 'habit_ids', None),
+                                          user2.study_habits, getattr(user2, 'habit_ids', None))
+        if common_habits:
+            score += min(common_habits * 8, 25)
+
+    # Life goals compatibility (20 points) - New high priority
+    if user1.life_goals and user2.life_goals:
+        common_goals = _common_tag_count(user1.life_goals, getattr(user1, 'goal_ids', None),
+                                         user2.life_goals, getattr(user2, 'goal_ids', None))
+        if common_goals:
+            score += min(common_goals * 10, 20)
+
+    # Bio compatibility (15 points) - New field for text similarity
+    if user1.bio and user2.bio:
+        # Keyword matching on precomputed bio signatures (stopwords excluded)
+        common_bio_words = _bio_feature(user1) & _bio_feature(user2)
+        if len(common_bio_words) >= 3:  # At least 3 common words
+            score += 15
+        elif len(common_bio_words) >= 1:  # At least 1 common word
+            score += 8
+
+    # Location matching (15 points) - Reduced importance
+    if user1.location and user2.location and user1.location == user2.location:
+        score += 15
+
+    # Course compatibility (10 points) - Reduced importance
+    if user1.course == user2.course:
+        score += 10
+    elif user1.course and user2.course:
+        if user1.course in SIMILAR_COURSES and user2.course in SIMILAR_COURSES[user1.course]:
+            score += 7
+
+    # Year compatibility (8 points) - Reduced importance
+    year_diff = abs(int(user1.year) - int(user2.year))
+    if year_diff == 0:
+        score += 8
+    elif year_diff == 1:
+        score += 6
+    elif year_diff == 2:
+        score += 4
+
+    # Personality compatibility (12 points) - Reduced importance
+    if user1.personality_type and user2.personality_type:
+        if (user1.personality_type, user2.personality_type) in COMPATIBLE_PERSONALITIES or (user2.personality_type, user1.personality_type) in COMPATIBLE_PERSONALITIES:
+            score += 12
+        elif user1.personality_type == user2.personality_type:
+            score += 8
+
+    return min(score, 100)
+
+
+def _tag_feature(profile, tags_attr, ids_attr):
+    """Return a profile's tags as (normalized set, tag ID set or None)"""
+    tags = getattr(profile, tags_attr)
+    if not tags:
+        return set(), None
+    return set(normalize_tag(tag) for tag in tags), getattr(profile, ids_attr, None)
+
+
+def _common_with(feature, tags, tag_ids):
+    """Count tags a candidate shares with a precomputed (set, tag ID set) feature"""
+    feature_tags, feature_ids = feature
+    if feature_ids is not None and tag_ids is not None:
+        return len(feature_ids & tag_ids)
+    return len(feature_tags.intersection(normalize_tag(tag) for tag in tags))
+
+
+def _course_points(course):
+    """Map every course to the points it earns against the given course"""
+    points = {}
+    if course in SIMILAR_COURSES:
+        for similar in SIMILAR_COURSES[course]:
+            points[similar] = 7
+    # An exact match always wins over a similar course
+    points[course] = 10
+    return points
+
+
+def _personality_points(personality_type):
+    """Map every personality type to the points it earns against the given type"""
+    points = {}
+    if personality_type:
+        points[personality_type] = 8
+        for first, second in COMPATIBLE_PERSONALITIES:
+            if first == personality_type:
+                points[second] = 12
+            elif second == personality_type:
+                points[first] = 12
+    return points
+
+
+def _flatten_ids(id_sets):
+    """Flatten per-candidate ID sets (None when missing) into (values, owner index) arrays"""
+    id_sets = [ids or () for ids in id_sets]
+    lengths = np.fromiter(map(len, id_sets), dtype=np.int64, count=len(id_sets))
+    values = np.fromiter(chain.from_iterable(id_sets), dtype=np.int64, count=int(lengths.sum()))
+    return values, np.repeat(np.arange(len(id_sets)), lengths)
+
+
+def _encode(values):
+    """Encode a column of hashable values as integer codes plus the distinct values"""
+    codes = {}
+    encoded = np.fromiter((codes.setdefault(value, len(codes)) for value in values), dtype=np.int64, count=len(values))
+    return encoded, list(codes)
+
+
+class CandidateFeatures:
+    """Per-candidate feature arrays for score_candidates.
+
+    Built once for a candidate list and reusable across many users (the
+    offline match job scores every owner against the same population), so
+    scoring only runs array operations against the current user. Building
+    them costs more than scoring one user with calculate_compatibility, so
+    one-off scoring such as find_top_matches uses that instead.
+    """
+
+    def __init__(self, candidates):
+        self.candidates = list(candidates)
+        self.count = count = len(self.candidates)
+        column = lambda attr: [getattr(candidate, attr, None) for candidate in self.candidates]
+
+        self.tags = {}
+        for tags_attr, ids_attr in (('interests', 'interest_ids'), ('study_habits', 'habit_ids'),
+                                    ('life_goals', 'goal_ids')):
+            has_tags = np.fromiter(map(bool, column(tags_attr)), dtype=bool, count=count)
+            id_sets = column(ids_attr)
+            # Profiles saved before tags were interned are compared by string
+            legacy = np.flatnonzero(has_tags & np.fromiter((ids is None for ids in id_sets), dtype=bool, count=count))
+            self.tags[tags_attr] = (has_tags, _flatten_ids(id_sets), legacy)
+
+        bios = column('bio')
+        self.has_bio = np.fromiter(map(bool, bios), dtype=bool, count=count)
+        self.bio = _flatten_ids([_bio_feature(candidate) if bio else None
+                                 for candidate, bio in zip(self.candidates, bios)])
+        self.locations = np.array(column('location'), dtype=object)
+        self.courses = _encode(column('course'))
+        self.personalities = _encode(column('personality_type'))
+        self.years = np.array([int(year) for year in column('year')], dtype=np.int64)
+
+    def _common(self, flattened, ids):
+        """Count each candidate's values that are also in ``ids``"""
+        values, owners = flattened
+        hits = np.isin(values, np.fromiter(ids, dtype=np.int64, count=len(ids)))
+        return np.bincount(owners, weights=hits, minlength=self.count).astype(np.int64)
+
+    def common_tags(self, tags_attr, feature):
+        """Count the tags each candidate shares with a precomputed (set, tag ID set) feature"""
+        common = np.zeros(self.count, dtype=np.int64)
+        if not feature[0]:
+            return common
+        has_tags, flattened, legacy = self.tags[tags_attr]
+        if feature[1] is None:
+            legacy = np.flatnonzero(has_tags)
+        else:
+            common = np.where(has_tags, self._common(flattened, feature[1]), 0)
+        for i in legacy:
+            common[i] = _common_with(feature, getattr(self.candidates[i], tags_attr), None)
+        return common
+
+    def common_bio_words(self, bio_words):
+        """Count the bio keywords each candidate shares with the given signature"""
+        if not bio_words:
+            return np.zeros(self.count, dtype=np.int64)
+        return np.where(self.has_bio, self._common(self.bio, bio_words), 0)
+
+
+def _points(encoded, points):
+    """Look up points for an encoded column"""
+    codes, values = encoded
+    return np.array([points.get(value, 0) for value in values], dtype=np.int64)[codes]
+
+
+def score_candidates(user, candidates):
+    """Score one user against many candidates with NumPy array operations.
+
+    ``candidates`` is a list of profiles or a prebuilt CandidateFeatures.
+    Returns a NumPy array of scores aligned with the candidates; each entry is
+    identical to ``calculate_compatibility(user, candidate)``. Only tag
+    overlaps with profiles saved before tags were interned fall back to a
+    per-candidate set intersection.
+    """
+    features = candidates if isinstance(candidates, CandidateFeatures) else CandidateFeatures(candidates)
+    if not features.count:
+        return np.zeros(0, dtype=np.int64)
+
+    # Overlap counts for every candidate at once
+    common_interests = features.common_tags('interests', _tag_feature(user, 'interests', 'interest_ids'))
+    common_habits = features.common_tags('study_habits', _tag_feature(user, 'study_habits', 'habit_ids'))
+    common_goals = features.common_tags('life_goals', _tag_feature(user, 'life_goals', 'goal_ids'))
+    common_bio_words = features.common_bio_words(_bio_feature(user) if user.bio else frozenset())
+    if user.location:
+        same_location = features.locations == user.location
+    else:
+        same_location = np.zeros(features.count, dtype=bool)
+
+    # Apply the weighting rules to all candidates at once
+    scores = np.minimum(common_interests * 12, 35)
+    scores += np.minimum(common_habits * 8, 25)
+    scores += np.minimum(common_goals * 10, 20)
+    scores += np.where(common_bio_words >= 3, 15, np.where(common_bio_words >= 1, 8, 0))
+    scores += np.where(same_location, 15, 0)
+    scores += _points(features.courses, _course_points(user.course))
+    year_diff = np.abs(features.years - int(user.year))
+    scores += np.select([year_diff == 0, year_diff == 1, year_diff == 2], [8, 6, 4], default=0)
+    scores += _points(features.personalities, _personality_points(user.personality_type))
+
+    return np.minimum(scores, 100)
+
+
+def profile_completeness(profile):
+    """Count how many of the free-form profile sections are filled in"""
+    score = 0
+    if profile.interests: score += 1
+    if profile.study_habits: score += 1
+    if profile.life_goals: score += 1
+    if profile.bio: score += 1
+    return score
+
+
+def candidate_tiers(user):
+    """Split the candidate pool into tiers of decreasing best possible score.
+
+    Each tier is a (filter, upper_bound) pair. The bound is the highest score a
+    candidate can reach if it matches this tier's filter but none of the
+    earlier ones, so later tiers can be skipped once the top-K beats it.
+    """
+    bio_points = 15 if user.bio else 0
+    personality_points = 12 if user.personality_type else 0
+    tiers = []
+
+    # Tier 1: shares a tag or a location bucket (or has no interned tags yet)
+    tag_fields = (('interest_ids', getattr(user, 'interest_ids', None)),
+                  ('habit_ids', getattr(user, 'habit_ids', None)),
+                  ('goal_ids', getattr(user, 'goal_ids', None)))
+    if any(tag_ids is None for _, tag_ids in tag_fields):
+        # Without interned tags we cannot use the tag index, so score everyone
+        return [({}, 100)]
+    shared = [{'interest_ids': {'$exists': False}}]
+    for field, tag_ids in tag_fields:
+        if tag_ids:
+            shared.append({field: {'$in': sorted(tag_ids)}})
+    if user.location:
+        shared.append({'location': user.location})
+    tiers.append(({'$or': shared}, 100))
+
+    # Tier 2: same or similar course, or within two years
+    courses = [user.course] + SIMILAR_COURSES.get(user.course, [])
+    year = int(user.year)
+    tiers.append(({'$or': [{'course': {'$in': courses}},
+                           {'year': {'$gte': year - 2, '$lte': year + 2}}]},
+                  bio_points + 10 + 8 + personality_points))
+
+    # Tier 3: everyone else can only score on bio and personality
+    tiers.append(({}, bio_points + personality_points))
+    return tiers
+
+
+def ranking_key(profile):
+    """Stable sort key for ranked matches: compatibility, completeness, then ID"""
+    return (profile.compatibility_score, profile_completeness(profile), str(profile.id))
+
+
+def match_pair_id(user_a, user_b):
+    """Key a match by its ordered user pair so either side finds the same document"""
+    low, high = sorted([str(user_a), str(user_b)])
+    return f"{low}_{high}"
+
+
+def find_top_matches(collection, user, base_filter, make_profile=CandidateProfile, limit=None, min_score=0,
+                     after=None, projection=SCORING_FIELDS):
+    """Find the best scoring candidates, skipping tiers that cannot reach the top-K.
+
+    Candidates are loaded from ``collection`` with ``base_filter`` tier by tier,
+    only fetching ``projection``, built with ``make_profile`` and scored one by one. Returns profiles sorted by
+    ``ranking_key`` with ``compatibility_score`` set. Pass the ranking key of
+    the last profile already shown as ``after`` to get the next page.
+    """
+    # With a limit, ranked is a min-heap holding the best ``limit`` entries so far
+    ranked = []
+    scored_tiers = []
+    for tier_filter, upper_bound in candidate_tiers(user):
+        if upper_bound < min_score:
+            break
+        if limit and len(ranked) >= limit and ranked[0][0] > upper_bound:
+            # Stop once no remaining candidate can displace the current top-K
+            break
+
+        query = [base_filter]
+        if tier_filter:
+            query.append(tier_filter)
+        if scored_tiers:
+            query.append({'$nor': scored_tiers})
+        # One pass per candidate: building CandidateFeatures for a single user costs more than it saves
+        for user_data in collection.find({'$and': query}, projection):
+            profile = make_profile(user_data)
+            score = calculate_compatibility(user, profile)
+            if score >= min_score:
+                profile.compatibility_score = score
+                key = ranking_key(profile)
+                if after is None or key < tuple(after):
+                    entry = key + (profile,)
+                    if not limit:
+                        ranked.append(entry)
+                    elif len(ranked) < limit:
+                        heapq.heappush(ranked, entry)
+                    else:
+                        heapq.heappushpop(ranked, entry)
+        if tier_filter:
+            scored_tiers.append(tier_filter)
+
+    # Sort by compatibility first, then by profile completeness
+    ranked.sort(key=lambda entry: entry[:3], reverse=True)
+    return [entry[3] for entry in ranked]
+
+
+def _normalized_tags_expr(field):
+    """Aggregation expression normalizing a tag array like normalize_tag"""
+    return {'$map': {
+        'input': {'$ifNull': [f'${field}', []]},
+        'as': 'tag',
+        'in': {'$toLower': {'$trim': {'input': '$$tag'}}}
+    }}
+
+
+def _common_tags_expr(tags_field, ids_field, tags, tag_ids):
+    """Aggregation expression counting tags shared with the given profile"""
+    common_strings = {'$size': {'$setIntersection': [
+        _normalized_tags_expr(tags_field),
+        sorted(set(normalize_tag(tag) for tag in tags))
+    ]}}
+    if tag_ids is None:
+        return common_strings
+    # Compare interned IDs when the candidate has them, strings otherwise
+    return {'$cond': [
+        {'$isArray': f'${ids_field}'},
+        {'$size': {'$setIntersection': [f'${ids_field}', sorted(tag_ids)]}},
+        common_strings
+    ]}
+
+
+def _points_expr(branches):
+    """Aggregation $switch returning points for the first matching condition"""
+    return {'$switch': {
+        'branches': [{'case': case, 'then': points} for case, points in branches],
+        'default': 0
+    }}
+
+
+def compatibility_pipeline(user, base_filter, limit=None, min_score=0, after=None):
+    """Build an aggregation pipeline that scores candidates inside MongoDB.
+
+    Applies the same rules as calculate_compatibility and returns only
+    ``_id``, ``score`` and ``completeness`` for the top candidates, ordered
+    like ``ranking_key``.
+    """
+    components = []
+
+    # Interests, study habits and life goals
+    for tags_field, ids_field, per_tag, cap in (
+            ('interests', 'interest_ids', 12, 35),
+            ('study_habits', 'habit_ids', 8, 25),
+            ('life_goals', 'goal_ids', 10, 20)):
+        tags = getattr(user, tags_field)
+        if tags:
+            common = _common_tags_expr(tags_field, ids_field, tags, getattr(user, ids_field, None))
+            components.append({'$min': [{'$multiply': [common, per_tag]}, cap]})
+
+    # Bio keywords
+    if bio_tokens(user.bio):
+        bio_words = {'$map': {
+            'input': {'$regexFindAll': {'input': {'$toLower': {'$ifNull': ['$bio', '']}}, 'regex': r'\S+'}},
+            'as': 'word',
+            'in': '$$word.match'
+        }}
+        # Compare stored signatures, or raw words for profiles saved before them
+        # (intersecting with our stopword-free tokens drops their stopwords too)
+        common_bio_words = {'$cond': [
+            {'$isArray': '$bio_signature'},
+            {'$size': {'$setIntersection': ['$bio_signature', bio_signature(user.bio)]}},
+            {'$size': {'$setIntersection': [bio_words, sorted(bio_tokens(user.bio))]}}
+        ]}
+        components.append(_points_expr([
+            ({'$gte': [common_bio_words, 3]}, 15),
+            ({'$gte': [common_bio_words, 1]}, 8)
+        ]))
+
+    # Location
+    if user.location:
+        components.append({'$cond': [{'$eq': ['$location', user.location]}, 15, 0]})
+
+    # Course
+    components.append(_points_expr([
+        ({'$eq': ['$course', user.course]}, 10),
+        ({'$in': ['$course', SIMILAR_COURSES.get(user.course, []) if user.course else []]}, 7)
+    ]))
+
+    # Year
+    year_diff = {'$abs': {'$subtract': [{'$toInt': '$year'}, int(user.year)]}}
+    components.append(_points_expr([
+        ({'$eq': [year_diff, 0]}, 8),
+        ({'$eq': [year_diff, 1]}, 6),
+        ({'$eq': [year_diff, 2]}, 4)
+    ]))
+
+    # Personality
+    personality_points = _personality_points(user.personality_type)
+    if personality_points:
+        components.append(_points_expr([
+            ({'$in': ['$personality_type', [p for p, points in personality_points.items() if points == 12]]}, 12),
+            ({'$eq': ['$personality_type', user.personality_type]}, 8)
+        ]))
+
+    # Profile completeness, used to break ties like profile_completeness()
+    filled = lambda field: {'$cond': [{'$gt': [{'$size': {'$ifNull': [f'${field}', []]}}, 0]}, 1, 0]}
+    completeness = {'$add': [
+        filled('interests'),
+        filled('study_habits'),
+        filled('life_goals'),
+        {'$cond': [{'$gt': [{'$strLenCP': {'$ifNull': ['$bio', '']}}, 0]}, 1, 0]}
+    ]}
+
+    pipeline = [
+        {'$match': base_filter},
+        {'$project': {
+            'score': {'$min': [{'$add': components}, 100]},
+            'completeness': completeness
+        }}
+    ]
+    if min_score:
+        pipeline.append({'$match': {'score': {'$gte': min_score}}})
+    if after:
+        score, completeness_after, last_id = after
+        pipeline.append({'$match': {'$or': [
+            {'score': {'$lt': score}},
+            {'score': score, 'completeness': {'$lt': completeness_after}},
+            {'score': score, 'completeness': completeness_after, '_id': {'$lt': ObjectId(last_id)}}
+        ]}})
+    pipeline.append({'$sort': {'score': -1, 'completeness': -1, '_id': -1}})
+    if limit:
+        pipeline.append({'$limit': limit})
+    return pipeline
@@ -0,0 +1,172 @@
+"""Publish/subscribe brokers for pushing chat events to open connections.
+
+Both brokers publish an event dict to a named channel, and listen() yields a
+channel's events for a bounded time, yielding None whenever ``heartbeat``
+seconds pass without one so streams can send keep-alives. listen_all() does
+the same for every channel, yielding (channel, event) pairs:
+
+- MemoryBroker keeps subscribers in process; fine for a single worker and
+  for local testing.
+- MongoBroker shares events between worker processes (or machines) through a
+  small capped collection, read by one long-lived tailable cursor per
+  process that fans events out to that process's listeners.
+"""
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+
+class MemoryBroker:
+    """In-process broker: every listener gets its own queue"""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+            all_subscribers = list(self._subscribers.get(None, ()))
+        for subscriber in subscribers:
+            subscriber.put(event)
+        for subscriber in all_subscribers:
+            subscriber.put((channel, event))
+
+    def listen(self, channel, seconds, heartbeat=15):
+        return self._listen(channel, seconds, heartbeat)
+
+    def listen_all(self, seconds, heartbeat=15):
+        return self._listen(None, seconds, heartbeat)
+
+    def _listen(self, key, seconds, heartbeat):
+        """Yield what is queued for one channel (or every channel, for None)"""
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(subscriber)
+        try:
+            deadline = time.monotonic() + seconds
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    yield subscriber.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    yield None
+        finally:
+            with self._lock:
+                self._subscribers[key].remove(subscriber)
+                if not self._subscribers[key]:
+                    del self._subscribers[key]
+
+
+class MongoBroker:
+    """Broker shared through a capped MongoDB collection.
+
+    One daemon thread per process keeps a tailable cursor open on the
+    collection and hands each event to local listeners, so events are never
+    missed between two listen() calls or while a listener reconnects.
+    """
+
+    def __init__(self, db, collection='realtime_events', size=8 * 1024 * 1024, resume_window=60):
+        self.db = db
+        self.name = collection
+        self.size = size
+        # Seconds of events re-read to find the resume point after the cursor dies
+        self.resume_window = resume_window
+        self._ready = False
+        self._local = MemoryBroker()
+        self._tailer = None
+        self._lock = threading.Lock()
+
+    def _collection(self):
+        """The capped events collection, created on first use"""
+        if not self._ready:
+            if self.name not in self.db.list_collection_names():
+                try:
+                    self.db.create_collection(self.name, capped=True, size=self.size)
+                except CollectionInvalid:
+                    pass  # Created meanwhile by another worker
+            self._ready = True
+        return self.db[self.name]
+
+    def publish(self, channel, event):
+        self._collection().insert_one({'channel': channel, 'event': event})
+
+    def listen(self, channel, seconds, heartbeat=15):
+        self._start()
+        return self._local.listen(channel, seconds, heartbeat)
+
+    def listen_all(self, seconds, heartbeat=15):
+        self._start()
+        return self._local.listen_all(seconds, heartbeat)
+
+    def _start(self):
+        """Start tailing the collection on first use"""
+        with self._lock:
+            if self._tailer is None:
+                self._tailer = threading.Thread(target=self._run, name='realtime-tail', daemon=True)
+                self._tailer.start()
+
+    def _run(self):
+        """Forward every event inserted after startup to the local listeners"""
+        last_id = None
+        started = False
+        while True:
+            try:
+                collection = self._collection()
+                if not started:
+                    # Start after the newest event already stored
+                    newest = next(collection.find({}, {'_id': 1}).sort('$natural', -1).limit(1), None)
+                    last_id = newest and newest['_id']
+                    started = True
+                for document in self._tail(collection, last_id):
+                    last_id = document['_id']
+                    self._local.publish(document['channel'], document['event'])
+            except PyMongoError as e:
+                print(f"❌ Realtime event tail failed: {e}")
+            # The cursor died (e.g. the collection was empty); reopen it shortly
+            time.sleep(1)
+
+    def _tail(self, collection, last_id):
+        """Yield event documents inserted after ``last_id`` until the tailable cursor dies.
+
+        Documents come in natural (insertion) order. ObjectIds minted by other
+        processes are not ordered by insertion, so instead of filtering on
+        _id > last_id the cursor re-reads a short window and skips forward
+        past ``last_id``.
+        """
+        query = {}
+        if last_id is not None:
+            window_start = last_id.generation_time - timedelta(seconds=self.resume_window)
+            query = {'_id': {'$gte': ObjectId.from_datetime(window_start)}}
+        # Documents read before last_id turns up (None once it has)
+        skipped = [] if last_id is not None else None
+        cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT).max_await_time_ms(1000)
+        try:
+            while cursor.alive:
+                document = cursor.try_next()
+                if document is None:
+                    if skipped is not None:
+                        # Caught up without meeting last_id: it was overwritten, so all we read is new
+                        yield from skipped
+                        skipped = None
+                elif skipped is None:
+                    yield document
+                elif document['_id'] == last_id:
+                    skipped = None
+                else:
+                    skipped.append(document)
+        finally:
+            cursor.close()
+
+
+def create_broker(backend, db=None, size=8 * 1024 * 1024):
+    """Build the broker named by the REALTIME_BACKEND setting"""
+    if backend == 'memory':
+        return MemoryBroker()
+    if backend == 'mongodb':
+        return MongoBroker(db, size=size)
+    raise ValueError(f"Unknown realtime backend: {backend}")
@@ -0,0 +1,133 @@
+"""Shared fixtures: the Flask app running against an in-memory MongoDB (mongomock)"""
+import os
+import types
+from datetime import datetime, timezone
+
+import pytest
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from werkzeug.security import generate_password_hash
+
+# main.py connects on import; fail fast instead of waiting for a real server
+os.environ.setdefault('MONGO_URI', 'mongodb://127.0.0.1:1/institute_dating_test?serverSelectionTimeoutMS=50')
+os.environ['ENSURE_INDEXES_ON_STARTUP'] = 'false'
+
+PASSWORD = 'secret-pw'
+PASSWORD_HASH = generate_password_hash(PASSWORD)
+
+
+def _bulk_write(collection, requests, ordered=True, **kwargs):
+    """bulk_write for mongomock, which breaks on the update requests of current PyMongo"""
+    result = types.SimpleNamespace(inserted_count=0, matched_count=0, modified_count=0,
+                                   deleted_count=0, upserted_count=0)
+    errors = []
+    for index, request in enumerate(requests):
+        try:
+            if isinstance(request, InsertOne):
+                collection.insert_one(request._doc)
+                result.inserted_count += 1
+                continue
+            if isinstance(request, (UpdateOne, UpdateMany)):
+                update = collection.update_one if isinstance(request, UpdateOne) else collection.update_many
+                outcome = update(request._filter, request._doc, upsert=request._upsert,
+                                 array_filters=request._array_filters)
+            elif isinstance(request, ReplaceOne):
+                outcome = collection.replace_one(request._filter, request._doc, upsert=request._upsert)
+            elif isinstance(request, (DeleteOne, DeleteMany)):
+                delete = collection.delete_one if isinstance(request, DeleteOne) else collection.delete_many
+                result.deleted_count += delete(request._filter).deleted_count
+                continue
+            result.matched_count += outcome.matched_count
+            result.modified_count += outcome.modified_count
+            result.upserted_count += outcome.upserted_id is not None
+        except DuplicateKeyError as e:
+            errors.append({'index': index, 'code': 11000, 'errmsg': str(e)})
+            if ordered:
+                break
+    if errors:
+        raise BulkWriteError({'writeErrors': errors, 'nInserted': result.inserted_count})
+    return result
+
+
+def _naive_utc(value):
+    """Stored datetimes come back naive, as UTC; convert aware ones so they compare"""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _naive_max(update_method):
+    """mongomock cannot $max an aware datetime against a stored (naive) one; compare them as UTC"""
+    def update(collection, filter, update, *args, **kwargs):
+        if '$max' in update:
+            update = dict(update, **{'$max': {key: _naive_utc(value) for key, value in update['$max'].items()}})
+        return update_method(collection, filter, update, *args, **kwargs)
+    return update
+
+
+@pytest.fixture
+def main_module():
+    return pytest.importorskip('main')
+
+
+@pytest.fixture
+def db(main_module, monkeypatch):
+    """A fresh in-memory database wired into main.py"""
+    mongomock = pytest.importorskip('mongomock')
+    collection_class = mongomock.collection.Collection
+    monkeypatch.setattr(collection_class, 'bulk_write', _bulk_write)
+    monkeypatch.setattr(collection_class, 'update_one', _naive_max(collection_class.update_one))
+
+    database = mongomock.MongoClient().institute_dating_test
+    database.likes.create_index([('liker_id', 1), ('liked_id', 1)], unique=True)
+    monkeypatch.setattr(main_module, 'mongo', types.SimpleNamespace(db=database), raising=False)
+    monkeypatch.setattr(main_module, 'send_match_notification_email', lambda *args, **kwargs: None)
+    main_module.match_cache.clear()
+    main_module.app.config['TESTING'] = True
+    return database
+
+
+@pytest.fixture
+def make_user(db):
+    """Insert a verified user and return their ID as a string"""
+    def make(username, gender='Male', interested_in='Female', **fields):
+        user_data = {
+            'username': username,
+            'email': f'{username}@example.edu',
+            'password_hash': PASSWORD_HASH,
+            'first_name': username.title(),
+            'last_name': 'Student',
+            'age': 21,
+            'gender': gender,
+            'interested_in': interested_in,
+            'institute': 'IIT Madras',
+            'course': '(B.Tech)',
+            'year': 2,
+            'bio': '',
+            'profile_picture': '',
+            'location': '',
+            'building_block': '',
+            'interests': [],
+            'study_habits': [],
+            'personality_type': '',
+            'life_goals': [],
+            'interest_ids': [],
+            'habit_ids': [],
+            'goal_ids': [],
+            'bio_signature': [],
+            'is_verified': True
+        }
+        user_data.update(fields)
+        return str(db.users.insert_one(user_data).inserted_id)
+    return make
+
+
+@pytest.fixture
+def login(main_module, db):
+    """Return a test client logged in as the given username"""
+    def log_in(username):
+        client = main_module.app.test_client()
+        response = client.post('/login', data={'username': username, 'password': PASSWORD})
+        assert response.status_code == 302
+        return client
+    return log_in
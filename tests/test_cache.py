@@ -0,0 +1,85 @@
+"""Tests for the TTL/LRU cache and how the app keeps its match cache in sync"""
+import types
+
+import pytest
+
+import cache
+from cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Control the time the cache sees"""
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now.value)
+    return now
+
+
+def test_entries_expire_after_the_ttl(clock):
+    entries = TTLCache(maxsize=10, ttl=30)
+    entries.set('pair', True)
+
+    clock.value += 29
+    assert entries.get('pair') is True
+    clock.value += 1
+    assert entries.get('pair', 'missing') == 'missing'
+    assert entries.stats() == {'size': 0, 'maxsize': 10, 'hits': 1, 'misses': 1, 'hit_rate': 0.5}
+
+
+def test_least_recently_used_entry_is_evicted_when_full(clock):
+    entries = TTLCache(maxsize=2, ttl=30)
+    entries.set('a', 1)
+    entries.set('b', 2)
+    # Reading 'a' makes 'b' the least recently used
+    assert entries.get('a') == 1
+
+    entries.set('c', 3)
+
+    assert (entries.get('a'), entries.get('b'), entries.get('c')) == (1, None, 3)
+    assert entries.stats()['size'] == 2
+
+
+def test_invalidate_drops_only_the_given_keys(clock):
+    entries = TTLCache()
+    for key in ('a', 'b', 'c'):
+        entries.set(key, True)
+
+    entries.invalidate('a', 'c', 'unknown')
+
+    assert [entries.get(key) for key in ('a', 'b', 'c')] == [None, True, None]
+
+
+def test_health_reports_match_cache_counters(main_module, db, make_user, login):
+    me = make_user('viewer')
+    other = make_user('other', gender='Female', interested_in='Male')
+    with main_module.app.app_context():
+        main_module.record_match(me, other)
+    client = login('viewer')
+    before = client.get('/health').get_json()['match_cache']
+    for content in ('Hi!', 'Are you there?', 'Coffee later?'):
+        client.post('/send_message', data={'receiver_id': other, 'content': content})
+
+    data = client.get('/health').get_json()
+
+    assert data['status'] == 'ok'
+    # The first send looks the match up, the next two find it cached
+    assert data['match_cache']['misses'] - before['misses'] == 1
+    assert data['match_cache']['hits'] - before['hits'] == 2
+
+
+def test_ended_matches_are_dropped_from_every_process(main_module, db, monkeypatch):
+    published = []
+    monkeypatch.setattr(main_module, 'broker', types.SimpleNamespace(
+        publish=lambda channel, event: published.append((channel, event)),
+        listen=lambda channel, seconds, heartbeat=15: iter([None] + [event for _, event in published])
+    ))
+    main_module.match_cache.set('a_b', True)
+
+    main_module.forget_matches(['a_b'])
+    assert main_module.match_cache.get('a_b') is None
+    assert published == [('match-cache', {'pair_ids': ['a_b']})]
+
+    # Another worker's listener drops the same match when the event arrives
+    main_module.match_cache.set('a_b', True)
+    main_module.listen_for_ended_matches()
+    assert main_module.match_cache.get('a_b') is None
@@ -0,0 +1,51 @@
+"""Tests for conditional GETs on the polling endpoints"""
+
+
+def poll(client, url, etag=None):
+    return client.get(url, headers={'If-None-Match': etag} if etag else {})
+
+
+def test_notifications_poll_answers_304_until_a_new_like(make_user, login):
+    make_user('viewer')
+    liker = make_user('liker', gender='Female', interested_in='Male')
+    me = make_user('other')
+    client = login('other')
+
+    first = poll(client, '/get_notifications')
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'private, no-cache'
+    unchanged = poll(client, '/get_notifications', first.headers['ETag'])
+    assert unchanged.status_code == 304 and not unchanged.data
+    assert unchanged.headers['ETag'] == first.headers['ETag']
+
+    login('liker').post('/swipe_batch', json={'decisions': [{'user_id': me, 'action': 'like'}]})
+
+    changed = poll(client, '/get_notifications', first.headers['ETag'])
+    assert changed.status_code == 200 and changed.headers['ETag'] != first.headers['ETag']
+    assert changed.get_json()['unread_count'] == 1
+    assert [notif['liker_id'] for notif in changed.get_json()['notifications']] == [liker]
+
+
+def test_messages_poll_answers_304_until_a_new_message(main_module, make_user, login):
+    me = make_user('viewer')
+    other = make_user('other', gender='Female', interested_in='Male')
+    with main_module.app.app_context():
+        main_module.record_match(me, other)
+    client, sender = login('viewer'), login('other')
+    sender.post('/send_message', data={'receiver_id': me, 'content': 'Hi!'})
+
+    first = poll(client, f'/get_messages/{other}')
+    assert first.status_code == 200
+    assert poll(client, f'/get_messages/{other}', first.headers['ETag']).status_code == 304
+
+    # Each cursor is cached under its own tag
+    since_url = f'/get_messages/{other}?since={first.get_json()["cursor"]}'
+    since = poll(client, since_url, first.headers['ETag'])
+    # The poll re-reads a short window before its cursor, which the chat page dedupes
+    assert since.status_code == 200 and [message['content'] for message in since.get_json()['messages']] == ['Hi!']
+    assert poll(client, since_url, since.headers['ETag']).status_code == 304
+
+    sender.post('/send_message', data={'receiver_id': me, 'content': 'Are you free later?'})
+
+    changed = poll(client, since_url, since.headers['ETag'])
+    assert changed.status_code == 200
+    assert [message['content'] for message in changed.get_json()['messages']] == ['Hi!', 'Are you free later?']
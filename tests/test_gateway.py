@@ -0,0 +1,88 @@
+"""Tests for the WebSocket gateway"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+pytest.importorskip('websockets')
+from flask import Flask
+from flask.sessions import SecureCookieSessionInterface
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from websockets.exceptions import InvalidStatus
+
+from config import Config
+from gateway import Gateway, MongoMatchStore, SessionReader, bridge
+from realtime import MemoryBroker
+
+
+class MatchStore:
+    """Users 'a' and 'b' are matched"""
+
+    def is_match(self, user_a, user_b):
+        return {user_a, user_b} == {'a', 'b'}
+
+    def matched_users(self, user_id):
+        return {'a': ['b'], 'b': ['a']}.get(user_id, [])
+
+
+def session_cookie(user_id):
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    serializer = SecureCookieSessionInterface().get_signing_serializer(app)
+    return f"{app.config['SESSION_COOKIE_NAME']}={serializer.dumps({'_user_id': user_id})}"
+
+
+def run_with_gateway(scenario):
+    """Serve a gateway on a free port with a bridged memory broker and run scenario(url, broker)"""
+    async def main():
+        broker = MemoryBroker()
+        gateway = Gateway(SessionReader(Config), MatchStore())
+        stop = threading.Event()
+        threading.Thread(target=bridge, args=(broker, gateway, asyncio.get_running_loop(), stop), daemon=True).start()
+        try:
+            async with serve(gateway.handle, '127.0.0.1', 0, process_request=gateway.authenticate) as server:
+                port = server.sockets[0].getsockname()[1]
+                await scenario(f'ws://127.0.0.1:{port}', broker)
+        finally:
+            stop.set()
+    asyncio.run(main())
+
+
+def test_handshake_without_session_is_refused_with_401():
+    async def scenario(url, broker):
+        for headers in ({}, {'Cookie': 'session=forged'}):
+            with pytest.raises(InvalidStatus) as refused:
+                async with connect(url, additional_headers=headers):
+                    pass
+            assert refused.value.response.status_code == 401
+    run_with_gateway(scenario)
+
+
+def test_presence_typing_and_published_messages_reach_matches():
+    async def scenario(url, broker):
+        async with connect(url, additional_headers={'Cookie': session_cookie('a')}) as socket_a:
+            assert json.loads(await socket_a.recv()) == {'type': 'presence', 'online': []}
+            async with connect(url, additional_headers={'Cookie': session_cookie('b')}) as socket_b:
+                assert json.loads(await socket_b.recv()) == {'type': 'presence', 'online': ['a']}
+                assert json.loads(await socket_a.recv()) == {'type': 'presence', 'user_id': 'b', 'online': True}
+
+                await socket_b.send(json.dumps({'type': 'typing', 'to': 'a'}))
+                assert json.loads(await socket_a.recv()) == {'type': 'typing', 'user_id': 'b'}
+
+                broker.publish('user:a', {'message': {'_id': 'm1', 'content': 'hi'}})
+                received = json.loads(await asyncio.wait_for(socket_a.recv(), 5))
+                assert received == {'type': 'message', 'message': {'_id': 'm1', 'content': 'hi'}}
+            assert json.loads(await socket_a.recv()) == {'type': 'presence', 'user_id': 'b', 'online': False}
+    run_with_gateway(scenario)
+
+
+def test_published_match_cache_invalidations_reach_the_gateway_cache():
+    matches = MongoMatchStore(db=None)
+    matches.cache.set('a_b', True)
+    matches.cache.set('a_c', True)
+
+    Gateway(None, matches).dispatch('match-cache', {'pair_ids': ['a_b']})
+
+    assert matches.cache.get('a_b') is None and matches.cache.get('a_c') is True
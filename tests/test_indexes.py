@@ -0,0 +1,33 @@
+"""Tests for creating and retiring MongoDB indexes"""
+import pytest
+from pymongo import ASCENDING
+
+from indexes import INDEXES, OBSOLETE_INDEXES, ensure_indexes, index_name
+
+
+@pytest.fixture
+def database():
+    mongomock = pytest.importorskip('mongomock')
+    return mongomock.MongoClient().institute_dating_test
+
+
+def test_ensure_indexes_drops_replaced_indexes(database):
+    for name, obsolete in OBSOLETE_INDEXES.items():
+        for keys in obsolete:
+            database[name].create_index(keys)
+    database.messages.create_index([('receiver_id', ASCENDING), ('is_read', ASCENDING)], name='kept_by_hand')
+
+    ensure_indexes(database)
+    ensure_indexes(database)
+
+    for name, indexes in INDEXES.items():
+        existing = database[name].index_information()
+        assert all(index_name(keys) in existing for keys, _ in indexes)
+        assert not any(index_name(keys) in existing for keys in OBSOLETE_INDEXES.get(name, []))
+    # Indexes nobody declared are left alone
+    assert 'kept_by_hand' in database.messages.index_information()
+
+
+def test_obsolete_indexes_are_not_declared(database):
+    for name, obsolete in OBSOLETE_INDEXES.items():
+        assert not set(map(index_name, obsolete)) & {index_name(keys) for keys, _ in INDEXES[name]}
@@ -0,0 +1,77 @@
+"""Tests for the offline all-pairs matching job"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+
+match_job = pytest.importorskip('match_job')
+
+
+@pytest.fixture
+def population(make_user):
+    """A mixed population with shared tags, so scores spread and tie"""
+    users = []
+    for i in range(12):
+        gender, interested_in = ('Male', 'Female') if i % 3 else ('Female', 'Male')
+        users.append(make_user(f'student{i}', gender=gender, interested_in=interested_in,
+                               interests=['Chess'] * (i % 2), interest_ids=[7] * (i % 2),
+                               location='Hostel A' if i % 4 else '', year=1 + i % 3))
+    return users
+
+
+def ranked(recommendations, key):
+    return [(str(entry['user_id']), entry['score'], entry['completeness']) for entry in recommendations[key]]
+
+
+def test_job_output_matches_the_request_path_ranking(main_module, db, population, monkeypatch):
+    monkeypatch.setitem(main_module.app.config, 'RECOMMENDATIONS_LIMIT', 5)
+    db.likes.insert_one({'liker_id': ObjectId(population[1]), 'liked_id': ObjectId(population[0])})
+
+    match_job.run_job(db, 'IIT Madras', processes=1, chunk_size=4, limit=5)
+    stored = {str(recommendations['_id']): recommendations for recommendations in db.recommendations.find()}
+
+    assert set(stored) == set(population)
+    with main_module.app.app_context():
+        for user_id in population:
+            user = main_module.User(db.users.find_one({'_id': ObjectId(user_id)}))
+            built = main_module.build_recommendations(user)
+            job = stored[user_id]
+            for key in ('dashboard', 'suggestions'):
+                assert ranked(job, key) == ranked(built, key), (user_id, key)
+            for key in ('gender', 'interested_in', 'dashboard_fallback', 'dashboard_truncated'):
+                assert job[key] == built[key], (user_id, key)
+
+
+def test_resume_skips_users_the_unfinished_job_already_ranked(main_module, db, population):
+    started_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    job_id = db.match_jobs.insert_one({'institute': 'IIT Madras', 'started_at': started_at, 'finished_at': None}).inserted_id
+    # The first four were written by the interrupted run, the rest are left from an earlier one
+    for index, user_id in enumerate(population):
+        computed_at = started_at + timedelta(minutes=5) if index < 4 else started_at - timedelta(days=1)
+        db.recommendations.insert_one({'_id': ObjectId(user_id), 'dashboard': [], 'suggestions': [],
+                                       'computed_at': computed_at})
+
+    match_job.run_job(db, 'IIT Madras', processes=1, chunk_size=4, limit=5, resume=True)
+
+    assert db.match_jobs.count_documents({}) == 1
+    job = db.match_jobs.find_one({'_id': job_id})
+    assert job['finished_at'] is not None and job['users'] == len(population) - 4
+    for index, user_id in enumerate(population):
+        recommendations = db.recommendations.find_one({'_id': ObjectId(user_id)})
+        assert (recommendations['dashboard'] == []) == (index < 4), user_id
+
+
+def test_finished_jobs_are_not_resumed(main_module, db, population):
+    db.match_jobs.insert_one({'institute': 'IIT Madras', 'started_at': datetime.now(timezone.utc),
+                              'finished_at': datetime.now(timezone.utc)})
+
+    match_job.run_job(db, 'IIT Madras', processes=1, limit=5, resume=True)
+
+    assert db.match_jobs.count_documents({'finished_at': None}) == 0
+    assert db.match_jobs.count_documents({}) == 2
+    assert db.recommendations.count_documents({}) == len(population)
+
+
+def test_job_written_lists_outlive_the_job_interval(main_module):
+    config = main_module.app.config
+    assert config['RECOMMENDATIONS_TTL'] > config['MATCH_JOB_INTERVAL']
@@ -0,0 +1,121 @@
+"""Tests for the matches page"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import template_rendered
+
+
+@pytest.fixture
+def rendered(main_module):
+    """Record the context of every template rendered during a test"""
+    contexts = []
+    record = lambda sender, template, context, **extra: contexts.append(context)
+    template_rendered.connect(record, main_module.app)
+    yield contexts
+    template_rendered.disconnect(record, main_module.app)
+
+
+def matched_users(main_module, make_user, me, count):
+    """Match ``count`` new users with ``me``, the last one matched most recently"""
+    started = datetime.now(timezone.utc) - timedelta(days=1)
+    others = []
+    with main_module.app.app_context():
+        for i in range(count):
+            other = make_user(f'match{i}', gender='Female', interested_in='Male')
+            main_module.record_match(me, other, started + timedelta(minutes=i))
+            others.append(other)
+    return others
+
+
+def test_matches_are_paged_by_last_activity(main_module, db, make_user, login, rendered, monkeypatch):
+    monkeypatch.setitem(main_module.app.config, 'USERS_PER_PAGE', 3)
+    me = make_user('viewer')
+    others = matched_users(main_module, make_user, me, 7)
+    client = login('viewer')
+
+    pages = []
+    for page in (1, 2, 3):
+        assert client.get(f'/matches?page={page}').status_code == 200
+        pages.append(([match.id for match in rendered[-1]['matches']], rendered[-1]['has_next']))
+
+    newest_first = others[::-1]
+    assert pages == [(newest_first[:3], True), (newest_first[3:6], True), (newest_first[6:], False)]
+
+
+def test_matched_users_are_loaded_in_one_query(main_module, db, make_user, login, rendered, monkeypatch):
+    me = make_user('viewer')
+    others = matched_users(main_module, make_user, me, 5)
+    client = login('viewer')
+    queries = []
+    find_users = db.users.find
+    monkeypatch.setattr(db.users, 'find', lambda *args, **kwargs: queries.append(args) or find_users(*args, **kwargs))
+
+    client.get('/matches')
+
+    # Apart from load_user reading the viewer, the matched users come back in one query
+    assert len([query for query in queries if query[0]['_id'] != main_module.ObjectId(me)]) == 1
+    assert sorted(match.id for match in rendered[-1]['matches']) == sorted(others)
+
+
+def test_inbox_puts_the_latest_conversation_first_with_its_summary(main_module, db, make_user, login, rendered,
+                                                                   monkeypatch):
+    monkeypatch.setitem(main_module.app.config, 'MESSAGE_PREVIEW_LENGTH', 10)
+    me = make_user('viewer')
+    oldest, middle, newest = matched_users(main_module, make_user, me, 3)
+    login('match0').post('/send_message', data={'receiver_id': me, 'content': 'Long time no see, how are you?'})
+    client = login('viewer')
+    client.post('/send_message', data={'receiver_id': middle, 'content': 'Hey'})
+
+    client.get('/matches')
+
+    context = rendered[-1]
+    assert [match.id for match in context['matches']] == [middle, oldest, newest]
+    assert context['inbox'][oldest]['unread'] == 1
+    assert context['inbox'][oldest]['last_message']['preview'] == 'Long time '
+    assert context['inbox'][middle]['unread'] == 0
+    assert str(context['inbox'][middle]['last_message']['sender_id']) == me
+    assert context['inbox'][newest]['last_message'] is None
+
+
+def test_backfill_inbox_summarizes_existing_conversations(main_module, db, make_user):
+    me = make_user('viewer')
+    first, second = matched_users(main_module, make_user, me, 2)
+    db.matches.update_many({}, {'$unset': {'last_activity': ''}})
+    sent = datetime.now(timezone.utc) - timedelta(hours=1)
+    for minutes, content in ((0, 'First'), (5, 'Latest')):
+        db.messages.insert_one({
+            'conversation_id': main_module.match_pair_id(me, first),
+            'sender_id': main_module.ObjectId(first), 'receiver_id': main_module.ObjectId(me),
+            'content': content, 'timestamp': sent + timedelta(minutes=minutes), 'is_read': False
+        })
+
+    result = main_module.app.test_cli_runner().invoke(args=['backfill-inbox'])
+
+    assert result.exit_code == 0, result.output
+    summarized = db.matches.find_one({'_id': main_module.match_pair_id(me, first)})
+    assert summarized['last_message']['preview'] == 'Latest'
+    untouched = db.matches.find_one({'_id': main_module.match_pair_id(me, second)})
+    assert untouched['last_activity'] == untouched['created_at'] and 'last_message' not in untouched
+
+
+def test_a_send_racing_a_newer_one_keeps_the_newer_summary(main_module, db, make_user, login):
+    me = make_user('viewer')
+    other, = matched_users(main_module, make_user, me, 1)
+    pair_id = main_module.match_pair_id(me, other)
+    # A send stamped later than the next one committed first
+    newer = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(seconds=30)
+    db.matches.update_one({'_id': pair_id}, {'$set': {
+        'last_activity': newer, 'last_message': {'timestamp': newer, 'sender_id': main_module.ObjectId(other),
+                                                 'preview': 'Newer'}
+    }})
+    client = login('viewer')
+
+    client.post('/send_message', data={'receiver_id': other, 'content': 'Older'})
+    match = db.matches.find_one({'_id': pair_id})
+    assert match['last_message']['preview'] == 'Newer' and match['last_activity'] == newer.replace(tzinfo=None)
+    assert match['unread'][other] == 1
+
+    db.matches.update_one({'_id': pair_id}, {'$set': {'last_message.timestamp': newer - timedelta(days=1),
+                                                      'last_activity': newer - timedelta(days=1)}})
+    client.post('/send_message', data={'receiver_id': other, 'content': 'Latest'})
+    assert db.matches.find_one({'_id': pair_id})['last_message']['preview'] == 'Latest'
@@ -0,0 +1,175 @@
+"""Parity tests: batch scoring must agree with calculate_compatibility"""
+import os
+import random
+
+import pytest
+from bson import ObjectId
+
+from benchmarks.synthetic import TagVocabulary, generate_users
+from matching import (CandidateFeatures, CandidateProfile, bio_signature, calculate_compatibility, compatibility_pipeline,
+                      find_top_matches, profile_completeness, ranking_key, score_candidates)
+
+# The aggregation pipeline needs a real server; the test is skipped without one
+MONGO_TEST_URI = os.environ.get('MONGO_TEST_URI') or 'mongodb://localhost:27017/?serverSelectionTimeoutMS=500'
+
+LEGACY_FIELDS = ['interest_ids', 'habit_ids', 'goal_ids', 'bio_signature']
+
+
+def legacy(user_data, rng):
+    """Drop some of the fields profiles saved before interning did not have"""
+    user_data = dict(user_data)
+    for field in LEGACY_FIELDS:
+        if rng.random() < 0.3:
+            user_data.pop(field, None)
+    return user_data
+
+
+def edge_case_profiles(vocabulary):
+    """Hand-picked profiles around the scoring thresholds and legacy shapes"""
+    def profile(**fields):
+        user_data = {'_id': ObjectId(), 'course': '', 'year': 1, 'bio': '', 'location': '',
+                     'interests': [], 'study_habits': [], 'life_goals': [], 'personality_type': ''}
+        user_data.update(fields)
+        return user_data
+
+    tags = {'interests': ['Music', ' coding ', 'CHESS'], 'study_habits': ['Night owl'], 'life_goals': ['Teaching']}
+    interned = {'interest_ids': vocabulary.intern(tags['interests']), 'habit_ids': vocabulary.intern(tags['study_habits']),
+                'goal_ids': vocabulary.intern(tags['life_goals'])}
+    bio = 'late night coding and chess with chai'
+    return [
+        profile(),
+        profile(personality_type=None, year='3'),
+        profile(course='(B.Tech)', year=2, personality_type='Introvert', location='Ganga Hostel'),
+        profile(course='(M.Tech)', year=4, personality_type='Extrovert', location='Ganga Hostel'),
+        profile(bio=bio, bio_signature=bio_signature(bio), **tags, **interned),
+        # Same tags and bio, but saved before interning
+        profile(bio=bio, **{field: [tag.lower() for tag in values] for field, values in tags.items()}),
+        # Tags without interned IDs, and interned IDs without tags
+        profile(interests=['music'], interest_ids=[], bio='the and a', bio_signature=[]),
+        profile(interest_ids=interned['interest_ids'], habit_ids=interned['habit_ids'], goal_ids=[]),
+        profile(bio='chess chess chai', bio_signature=bio_signature('chess chess chai'), course='OTHERs', year=5),
+    ]
+
+
+@pytest.fixture(scope='module')
+def user_documents():
+    rng = random.Random(7)
+    vocabulary = TagVocabulary()
+    users = [legacy(user_data, rng) for user_data in generate_users(300, seed=7, vocabulary=vocabulary)]
+    return users + edge_case_profiles(vocabulary)
+
+
+@pytest.fixture(scope='module')
+def population(user_documents):
+    return [CandidateProfile(user_data) for user_data in user_documents]
+
+
+@pytest.fixture(scope='module')
+def users_collection(user_documents):
+    mongomock = pytest.importorskip('mongomock')
+    collection = mongomock.MongoClient().institute_dating_test.users
+    collection.insert_many([dict(user_data) for user_data in user_documents])
+    return collection
+
+
+@pytest.fixture(scope='module')
+def mongod_users(user_documents):
+    """The same population in a real MongoDB, for the aggregation pipeline"""
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    client = MongoClient(MONGO_TEST_URI)
+    try:
+        client.admin.command('ping')
+    except PyMongoError:
+        client.close()
+        pytest.skip(f'MongoDB is not reachable at {MONGO_TEST_URI}')
+    database = client.institute_dating_pipeline_test
+    database.users.drop()
+    database.users.insert_many([dict(user_data) for user_data in user_documents])
+    yield database.users
+    client.drop_database(database.name)
+    client.close()
+
+
+def expected_matches(user, population, limit=None, min_score=0, after=None):
+    """Rank every other candidate with calculate_compatibility and a full sort"""
+    ranked = []
+    for candidate in population:
+        key = (calculate_compatibility(user, candidate), profile_completeness(candidate), candidate.id)
+        if candidate.id != user.id and key[0] >= min_score and (after is None or key < tuple(after)):
+            ranked.append(key)
+    ranked.sort(reverse=True)
+    return ranked[:limit]
+
+
+def test_score_candidates_matches_calculate_compatibility(population):
+    features = CandidateFeatures(population)
+    for user in population:
+        expected = [calculate_compatibility(user, candidate) for candidate in population]
+        assert score_candidates(user, population).tolist() == expected
+        assert score_candidates(user, features).tolist() == expected
+
+
+def test_score_candidates_handles_empty_batches(population):
+    assert score_candidates(population[0], []).tolist() == []
+    assert score_candidates(population[0], CandidateFeatures([])).tolist() == []
+
+
+@pytest.mark.parametrize('limit, min_score', [(1, 0), (5, 0), (20, 30), (None, 0), (None, 45), (500, 0)])
+def test_find_top_matches_keeps_the_best_candidates(population, users_collection, limit, min_score):
+    for user in population[::37]:
+        base_filter = {'_id': {'$ne': ObjectId(user.id)}}
+        matches = find_top_matches(users_collection, user, base_filter, limit=limit, min_score=min_score)
+        assert [ranking_key(match) for match in matches] == expected_matches(user, population, limit, min_score)
+
+
+def test_find_top_matches_pages_with_after(population, users_collection):
+    user = population[0]
+    base_filter = {'_id': {'$ne': ObjectId(user.id)}}
+    pages, after = [], None
+    while True:
+        page = [ranking_key(match) for match in find_top_matches(users_collection, user, base_filter, limit=25,
+                                                                  after=after)]
+        if not page:
+            break
+        pages.extend(page)
+        after = page[-1]
+    assert pages == expected_matches(user, population)
+
+
+@pytest.mark.parametrize('limit, min_score', [(1, 0), (6, 0), (20, 30), (None, 0), (None, 45), (500, 0)])
+def test_compatibility_pipeline_matches_find_top_matches(population, mongod_users, limit, min_score):
+    for user in population[::23] + population[-9:]:
+        base_filter = {'_id': {'$ne': ObjectId(user.id)}}
+        expected = [ranking_key(match) for match in find_top_matches(mongod_users, user, base_filter, limit=limit,
+                                                                     min_score=min_score)]
+        results = mongod_users.aggregate(compatibility_pipeline(user, base_filter, limit, min_score))
+        assert [(result['score'], result['completeness'], str(result['_id'])) for result in results] == expected
+
+
+def test_compatibility_pipeline_pages_like_find_top_matches(population, mongod_users):
+    for user in population[:3] + population[-3:]:
+        base_filter = {'_id': {'$ne': ObjectId(user.id)}}
+        after = None
+        while True:
+            expected = [ranking_key(match) for match in find_top_matches(mongod_users, user, base_filter, limit=40,
+                                                                         min_score=10, after=after)]
+            results = mongod_users.aggregate(compatibility_pipeline(user, base_filter, 40, 10, after))
+            assert [(result['score'], result['completeness'], str(result['_id'])) for result in results] == expected
+            if not expected:
+                break
+            after = expected[-1]
+
+
+def test_benchmark_reference_loop_ranks_like_find_top_matches(population, users_collection):
+    from benchmarks.bench_matching import CachedQueries, loop_top_matches
+
+    cached = CachedQueries(users_collection)
+    for user in population[::41]:
+        base_filter = {'_id': {'$ne': ObjectId(user.id)}}
+        for limit, min_score in ((6, 0), (5, 30)):
+            expected = [ranking_key(match) for match in find_top_matches(cached, user, base_filter, limit=limit,
+                                                                         min_score=min_score)]
+            assert [ranking_key(match) for match in loop_top_matches(cached, user, base_filter, limit,
+                                                                     min_score)] == expected
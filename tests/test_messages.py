@@ -0,0 +1,161 @@
+"""Tests for read receipts, the per-conversation unread counters, message polling and chat history"""
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+
+def matched_pair(main_module, make_user, login):
+    """Match two users and return their IDs with a logged-in client for each"""
+    me = make_user('viewer')
+    other = make_user('other', gender='Female', interested_in='Male')
+    with main_module.app.app_context():
+        main_module.record_match(me, other)
+    return me, other, login('viewer'), login('other')
+
+
+def send(client, receiver_id, content):
+    return client.post('/send_message', data={'receiver_id': receiver_id, 'content': content}).get_json()['message_id']
+
+
+def unread(main_module, db, me, other):
+    return db.matches.find_one({'_id': main_module.match_pair_id(me, other)})['unread'][me]
+
+
+def test_read_receipts_take_messages_off_the_counter_once(main_module, db, make_user, login):
+    me, other, client, sender = matched_pair(main_module, make_user, login)
+    message_ids = [send(sender, me, content) for content in ('Hi!', 'How are you?', 'Coffee later?')]
+    send(client, other, 'Hello!')
+    assert unread(main_module, db, me, other) == 3
+
+    receipt = client.post(f'/mark_messages_read/{other}', json={'through': message_ids[1]}).get_json()
+    assert receipt == {'success': True, 'marked': 2}
+    assert unread(main_module, db, me, other) == 1
+    # A repeated receipt flips nothing, so nothing is taken off twice
+    assert client.post(f'/mark_messages_read/{other}', json={'through': message_ids[1]}).get_json()['marked'] == 0
+    assert unread(main_module, db, me, other) == 1
+
+    assert client.post(f'/mark_messages_read/{other}').get_json()['marked'] == 1
+    assert unread(main_module, db, me, other) == 0
+    assert db.messages.count_documents({'receiver_id': ObjectId(me), 'is_read': False}) == 0
+    # Messages the reader sent stay unread for the other side
+    assert db.messages.count_documents({'receiver_id': ObjectId(other), 'is_read': False}) == 1
+    assert unread(main_module, db, other, me) == 1
+
+
+def test_read_receipts_need_a_match_and_a_message_of_the_conversation(main_module, db, make_user, login):
+    me, other, client, sender = matched_pair(main_module, make_user, login)
+    stranger = make_user('stranger', gender='Female', interested_in='Male')
+    send(sender, me, 'Hi!')
+
+    assert client.post(f'/mark_messages_read/{stranger}').get_json()['success'] is False
+    missing = client.post(f'/mark_messages_read/{other}', json={'through': str(ObjectId())}).get_json()
+    assert missing == {'success': False, 'message': 'Message not found!'}
+    assert unread(main_module, db, me, other) == 1
+
+
+def test_opening_the_chat_marks_everything_read(main_module, db, make_user, login):
+    me, other, client, sender = matched_pair(main_module, make_user, login)
+    for content in ('Hi!', 'Are you there?'):
+        send(sender, me, content)
+
+    assert client.get(f'/chat/{other}').status_code == 200
+
+    assert unread(main_module, db, me, other) == 0
+    assert db.messages.count_documents({'receiver_id': ObjectId(me), 'is_read': False}) == 0
+
+
+def store(main_module, db, sender, receiver, content, timestamp):
+    """Insert a message as send_message does, with a chosen timestamp"""
+    message = {'conversation_id': main_module.match_pair_id(sender, receiver), 'sender_id': ObjectId(sender),
+               'receiver_id': ObjectId(receiver), 'content': content, 'timestamp': timestamp, 'is_read': False}
+    message['_id'] = db.messages.insert_one(message).inserted_id
+    return message
+
+
+def poll(client, other, cursor):
+    data = client.get(f'/get_messages/{other}?since={cursor}').get_json()
+    return [message['content'] for message in data['messages']], data['cursor']
+
+
+def test_polls_return_messages_after_the_cursor_within_the_lookback(main_module, db, make_user, login, monkeypatch):
+    monkeypatch.setitem(main_module.app.config, 'MESSAGE_POLL_LOOKBACK', timedelta(seconds=5))
+    me, other, client, _ = matched_pair(main_module, make_user, login)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    store(main_module, db, other, me, 'Old', now - timedelta(minutes=1))
+    seen = store(main_module, db, other, me, 'Seen', now)
+
+    assert poll(client, other, main_module.message_cursor(seen)) == (['Seen'], main_module.message_cursor(seen))
+
+    store(main_module, db, other, me, 'New', now + timedelta(seconds=10))
+    contents, cursor = poll(client, other, main_module.message_cursor(seen))
+    assert contents == ['Seen', 'New']
+    # Once the cursor moves on, messages older than the lookback are not sent again
+    assert poll(client, other, cursor)[0] == ['New']
+
+
+def test_polls_return_messages_sharing_the_cursor_timestamp(main_module, db, make_user, login):
+    me, other, client, _ = matched_pair(main_module, make_user, login)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    first, second = (store(main_module, db, other, me, content, now) for content in ('First', 'Second'))
+
+    contents, cursor = poll(client, other, main_module.message_cursor(first))
+
+    assert 'Second' in contents
+    assert cursor == main_module.message_cursor(second)
+
+
+def test_polls_pick_up_a_message_committed_after_the_cursor_was_handed_out(main_module, db, make_user, login):
+    me, other, client, _ = matched_pair(main_module, make_user, login)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    later = store(main_module, db, other, me, 'Later', now)
+    # A concurrent send stamped a moment earlier commits only after the client read up to ``later``
+    store(main_module, db, me, other, 'Earlier', now - timedelta(milliseconds=200))
+
+    contents, cursor = poll(client, other, main_module.message_cursor(later))
+
+    assert contents == ['Earlier', 'Later']
+    assert cursor == main_module.message_cursor(later)
+
+
+def scroll_back(main_module, client, me, other):
+    """IDs of every message reached from the chat page by paging back through chat_history, oldest first"""
+    chat_messages, cursor = main_module.conversation_page(me, other)
+    seen = [str(message['_id']) for message in chat_messages]
+    while cursor:
+        data = client.get(f'/chat_history/{other}?before={cursor}').get_json()
+        assert data['success'], data
+        seen[:0] = [message['_id'] for message in data['messages']]
+        cursor = data['before']
+    return seen
+
+
+def test_chat_history_pages_back_across_page_boundaries(main_module, db, make_user, login, monkeypatch):
+    monkeypatch.setitem(main_module.app.config, 'MESSAGES_PER_PAGE', 3)
+    me, other, client, _ = matched_pair(main_module, make_user, login)
+    start = datetime.now(timezone.utc).replace(microsecond=0) - timedelta(hours=1)
+    sent = [str(store(main_module, db, other, me, f'Message {i}', start + timedelta(minutes=i))['_id']) for i in range(9)]
+
+    assert scroll_back(main_module, client, me, other) == sent
+
+
+def test_chat_history_splits_identical_timestamps_without_gaps(main_module, db, make_user, login, monkeypatch):
+    monkeypatch.setitem(main_module.app.config, 'MESSAGES_PER_PAGE', 3)
+    me, other, client, _ = matched_pair(main_module, make_user, login)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    sent = [str(store(main_module, db, other, me, f'Burst {i}', now)['_id']) for i in range(7)]
+    store_order = sorted(sent, key=ObjectId)
+
+    # Ties are broken by ID, so every page boundary inside the burst is exact
+    assert scroll_back(main_module, client, me, other) == store_order
+
+
+def test_chat_history_rejects_malformed_and_foreign_cursors(main_module, db, make_user, login):
+    me, other, client, _ = matched_pair(main_module, make_user, login)
+    message = store(main_module, db, other, me, 'Hi!', datetime.now(timezone.utc))
+    position = list(main_module.message_position(message))
+    foreign = main_module.serializer.dumps(position, salt='dashboard-cursor')
+    tampered = main_module.message_cursor(message)[:-2] + 'xx'
+
+    for cursor in ('not-a-cursor', foreign, tampered):
+        data = client.get(f'/chat_history/{other}?before={cursor}').get_json()
+        assert data['success'] is False and 'messages' not in data, cursor
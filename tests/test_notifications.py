@@ -0,0 +1,110 @@
+"""Tests for like notifications and their unread counter"""
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+
+def like(login, liker, user_id):
+    login(liker).post('/swipe_batch', json={'decisions': [{'user_id': user_id, 'action': 'like'}]})
+
+
+def notifications(client):
+    return client.get('/get_notifications').get_json()
+
+
+def test_notifications_are_listed_from_liker_snapshots(main_module, db, make_user, login, monkeypatch):
+    me = make_user('viewer')
+    make_user('liker', gender='Female', interested_in='Male', profile_picture='liker.png')
+    like(login, 'liker', me)
+    client = login('viewer')
+    queries = []
+    find_users = db.users.find
+    monkeypatch.setattr(db.users, 'find', lambda *args, **kwargs: queries.append(args) or find_users(*args, **kwargs))
+
+    listed = notifications(client)['notifications']
+
+    assert [(notif['liker_name'], notif['liker_picture']) for notif in listed] == [('Liker Student', 'liker.png')]
+    # Only load_user reads the users collection
+    assert all(query[0] == {'_id': ObjectId(me)} for query in queries)
+
+
+def test_legacy_notifications_look_up_their_likers_in_one_batch(main_module, db, make_user, login, monkeypatch):
+    me = make_user('viewer')
+    likers = [make_user(f'liker{i}', gender='Female', interested_in='Male') for i in range(3)]
+    now = datetime.now(timezone.utc)
+    # Saved before likers were snapshotted; the last liker has since deleted their profile
+    db.notifications.insert_many([
+        {'liker_id': ObjectId(liker), 'receiver_id': ObjectId(me), 'message': 'Someone liked your profile!',
+         'timestamp': now - timedelta(minutes=i), 'is_read': False}
+        for i, liker in enumerate(likers)
+    ])
+    db.users.delete_one({'_id': ObjectId(likers[-1])})
+    client = login('viewer')
+    queries = []
+    find_users = db.users.find
+    monkeypatch.setattr(db.users, 'find', lambda *args, **kwargs: queries.append(args) or find_users(*args, **kwargs))
+
+    listed = notifications(client)['notifications']
+
+    assert [notif['liker_name'] for notif in listed] == ['Liker0 Student', 'Liker1 Student']
+    assert len([query for query in queries if query[0] != {'_id': ObjectId(me)}]) == 1
+
+
+def test_profile_edits_refresh_liker_snapshots(main_module, db, make_user, login):
+    me = make_user('viewer')
+    make_user('liker', gender='Female', interested_in='Male')
+    like(login, 'liker', me)
+    client = login('viewer')
+    version = db.users.find_one({'_id': ObjectId(me)})['notifications_version']
+
+    login('liker').post('/edit_profile', data={'first_name': 'Renamed', 'last_name': 'Liker', 'age': 22})
+
+    assert [notif['liker_name'] for notif in notifications(client)['notifications']] == ['Renamed Liker']
+    assert db.users.find_one({'_id': ObjectId(me)})['notifications_version'] > version
+
+
+def unread_count(db, user_id):
+    return db.users.find_one({'_id': ObjectId(user_id)})['unread_notifications']
+
+
+def test_unread_counter_follows_reads_and_deletes(main_module, db, make_user, login):
+    me = make_user('viewer')
+    for i in range(4):
+        make_user(f'liker{i}', gender='Female', interested_in='Male')
+        like(login, f'liker{i}', me)
+    client = login('viewer')
+    first, second = [notif['id'] for notif in notifications(client)['notifications']][:2]
+    assert unread_count(db, me) == 4
+
+    assert client.get(f'/mark_notification_read/{first}').get_json() == {'success': True, 'unread_count': 3}
+    # Reading it again changes nothing
+    assert client.get(f'/mark_notification_read/{first}').get_json()['unread_count'] == 3
+    assert client.delete(f'/delete_notification/{first}').get_json()['unread_count'] == 3
+    assert client.delete(f'/delete_notification/{second}').get_json()['unread_count'] == 2
+    assert client.get('/mark_all_notifications_read').get_json()['updated_count'] == 2
+    assert unread_count(db, me) == 0
+
+    # Clearing deletes read and unread notifications alike
+    make_user('liker4', gender='Female', interested_in='Male')
+    like(login, 'liker4', me)
+    assert client.get('/clear_all_notifications').get_json()['deleted_count'] == 3
+    assert unread_count(db, me) == 0
+    assert notifications(client)['unread_count'] == 0
+
+
+def test_reconcile_notification_counts_fixes_drift(main_module, db, make_user, login):
+    me = make_user('viewer')
+    in_sync = make_user('in_sync')
+    make_user('liker', gender='Female', interested_in='Male')
+    like(login, 'liker', me)
+    db.users.update_one({'_id': ObjectId(me)}, {'$set': {'unread_notifications': 7}})
+    db.users.update_one({'_id': ObjectId(in_sync)}, {'$set': {'unread_notifications': 0, 'notifications_version': 3}})
+    version = db.users.find_one({'_id': ObjectId(me)})['notifications_version']
+
+    result = main_module.app.test_cli_runner().invoke(args=['reconcile-notification-counts'])
+
+    assert result.exit_code == 0, result.output
+    assert unread_count(db, me) == 1
+    # Drifted counters get a new version so cached polls refresh; correct ones are left alone
+    assert db.users.find_one({'_id': ObjectId(me)})['notifications_version'] == version + 1
+    assert db.users.find_one({'_id': ObjectId(in_sync)})['notifications_version'] == 3
@@ -0,0 +1,82 @@
+"""Tests for the realtime brokers"""
+import itertools
+
+from bson import ObjectId
+
+from realtime import MemoryBroker, MongoBroker
+
+
+class FakeTailableCursor:
+    """Replays documents like a tailable cursor, then reports no new data once"""
+
+    def __init__(self, documents):
+        self.documents = list(documents)
+        self.alive = True
+        self.query = None
+
+    def max_await_time_ms(self, ms):
+        return self
+
+    def try_next(self):
+        if self.documents:
+            return self.documents.pop(0)
+        if self.alive == 'drained':
+            self.alive = False
+        else:
+            self.alive = 'drained'
+        return None
+
+    def close(self):
+        self.alive = False
+
+
+class FakeEvents:
+    def __init__(self, documents):
+        self.cursor = FakeTailableCursor(documents)
+
+    def find(self, query, cursor_type=None):
+        self.cursor.query = query
+        return self.cursor
+
+
+def event(channel):
+    return {'_id': ObjectId(), 'channel': channel, 'event': {'n': channel}}
+
+
+def test_memory_broker_delivers_to_channel_and_all_listeners():
+    broker = MemoryBroker()
+    channel_events = broker.listen('user:1', 5, heartbeat=0.01)
+    all_events = broker.listen_all(5, heartbeat=0.01)
+    # Generators subscribe when first advanced; a heartbeat comes back without events
+    assert next(channel_events) is None
+    assert next(all_events) is None
+
+    broker.publish('user:1', {'n': 1})
+    broker.publish('user:2', {'n': 2})
+
+    assert next(channel_events) == {'n': 1}
+    assert list(itertools.islice(all_events, 2)) == [('user:1', {'n': 1}), ('user:2', {'n': 2})]
+
+
+def test_tail_skips_to_the_last_seen_event_in_natural_order():
+    older, last, newer = event('a'), event('b'), event('c')
+    # An event from another process may carry a smaller ObjectId yet be inserted later
+    late = dict(event('d'), _id=ObjectId.from_datetime(older['_id'].generation_time))
+    events = FakeEvents([older, last, newer, late])
+
+    tailed = list(MongoBroker(None)._tail(events, last['_id']))
+
+    assert tailed == [newer, late]
+    assert '$gte' in events.cursor.query['_id']
+
+
+def test_tail_replays_the_window_when_the_last_event_was_overwritten():
+    first, second = event('a'), event('b')
+    events = FakeEvents([first, second])
+
+    assert list(MongoBroker(None)._tail(events, ObjectId())) == [first, second]
+
+
+def test_tail_reads_everything_without_a_resume_point():
+    first, second = event('a'), event('b')
+    assert list(MongoBroker(None)._tail(FakeEvents([first, second]), None)) == [first, second]
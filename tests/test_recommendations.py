@@ -0,0 +1,155 @@
+"""Tests for the stored dashboard and suggestion rankings"""
+import pytest
+from flask_login import login_user
+
+
+@pytest.fixture
+def small_lists(main_module, monkeypatch):
+    monkeypatch.setitem(main_module.app.config, 'RECOMMENDATIONS_LIMIT', 12)
+    monkeypatch.setitem(main_module.app.config, 'USERS_PER_PAGE', 5)
+
+
+def dashboard_ids(main_module, user_id):
+    """Every user reachable by paging through the dashboard"""
+    seen, cursor = [], None
+    with main_module.app.test_request_context():
+        login_user(main_module.User(main_module.mongo.db.users.find_one({'_id': main_module.ObjectId(user_id)})))
+        while True:
+            profiles, cursor = main_module.get_dashboard_page(cursor)
+            seen.extend(profile.id for profile in profiles)
+            if not cursor:
+                return seen
+
+
+def test_dashboard_pages_past_a_shrunk_stored_list(main_module, db, make_user, login, small_lists):
+    me = make_user('viewer')
+    candidates = {make_user(f'candidate{i}', gender='Female', interested_in='Male') for i in range(27)}
+
+    assert sorted(dashboard_ids(main_module, me)) == sorted(candidates)
+
+    skipped = dashboard_ids(main_module, me)[0]
+    response = login('viewer').post('/swipe_batch', json={'decisions': [{'user_id': skipped, 'action': 'skip'}]})
+    assert response.get_json()['success']
+
+    stored = db.recommendations.find_one({'_id': main_module.ObjectId(me)})
+    assert stored['dashboard_truncated'] and len(stored['dashboard']) == 11
+    # The skipped user only left the stored list; everyone ranked below it is still reachable
+    remaining = dashboard_ids(main_module, me)
+    assert len(remaining) == len(set(remaining))
+    assert set(remaining) | {skipped} == candidates
+
+
+def test_short_dashboard_list_is_not_continued(main_module, db, make_user, small_lists):
+    me = make_user('viewer')
+    candidates = {make_user(f'candidate{i}', gender='Female', interested_in='Male') for i in range(4)}
+
+    assert set(dashboard_ids(main_module, me)) == candidates
+    assert not db.recommendations.find_one({'_id': main_module.ObjectId(me)})['dashboard_truncated']
+
+
+def stored_dashboard(main_module, db, user_id):
+    recommendations = db.recommendations.find_one({'_id': main_module.ObjectId(user_id)})
+    return [str(entry['user_id']) for entry in recommendations['dashboard']]
+
+
+def add_profile(main_module, db, user_id):
+    """Run what verify_otp and edit_profile run after saving a profile"""
+    user_data = db.users.find_one({'_id': main_module.ObjectId(user_id)})
+    with main_module.app.app_context():
+        main_module.patch_recommendations(main_module.CandidateProfile(user_data))
+
+
+def test_new_profile_enters_full_lists_it_ranks_in(main_module, db, make_user, small_lists):
+    me = make_user('viewer', interests=['Chess'], interest_ids=[7], location='Hostel A')
+    candidates = {make_user(f'candidate{i}', gender='Female', interested_in='Male') for i in range(15)}
+    dashboard_ids(main_module, me)
+    assert len(stored_dashboard(main_module, db, me)) == 12
+
+    newcomer = make_user('newcomer', gender='Female', interested_in='Male',
+                         interests=['Chess'], interest_ids=[7], location='Hostel A')
+    add_profile(main_module, db, newcomer)
+
+    stored = stored_dashboard(main_module, db, me)
+    assert stored[0] == newcomer and len(stored) == 12
+    # The entry pushed off the end of the list is still reached by paging
+    assert sorted(dashboard_ids(main_module, me)) == sorted(candidates | {newcomer})
+
+
+def test_new_profile_below_a_full_list_is_left_to_the_live_query(main_module, db, make_user, small_lists):
+    me = make_user('viewer')
+    candidates = {make_user(f'candidate{i}', gender='Female', interested_in='Male') for i in range(15)}
+    dashboard_ids(main_module, me)
+    before = stored_dashboard(main_module, db, me)
+
+    newcomer = make_user('newcomer', gender='Female', interested_in='Male', course='(MBA)', year=5)
+    add_profile(main_module, db, newcomer)
+
+    assert stored_dashboard(main_module, db, me) == before
+    assert sorted(dashboard_ids(main_module, me)) == sorted(candidates | {newcomer})
+
+
+def test_new_profile_joins_short_lists_and_suggestions(main_module, db, make_user, small_lists):
+    me = make_user('viewer', interests=['Chess'], interest_ids=[7], location='Hostel A')
+    low = make_user('low', gender='Female', interested_in='Male', course='(MBA)', year=5)
+    dashboard_ids(main_module, me)
+
+    newcomers = [
+        make_user('lower', gender='Female', interested_in='Male', course='(MBA)', year=6),
+        make_user('match', gender='Female', interested_in='Male',
+                  interests=['Chess'], interest_ids=[7], location='Hostel A')
+    ]
+    for newcomer in newcomers:
+        add_profile(main_module, db, newcomer)
+
+    # Short lists hold every candidate, so even a low score is added
+    assert set(stored_dashboard(main_module, db, me)) == {low} | set(newcomers)
+    suggestions = db.recommendations.find_one({'_id': main_module.ObjectId(me)})['suggestions']
+    assert [str(entry['user_id']) for entry in suggestions] == [newcomers[1]]
+
+
+def test_fallback_dashboard_is_rebuilt_once_a_preferred_profile_appears(main_module, db, make_user, small_lists):
+    me = make_user('viewer')
+    other = make_user('other', gender='Male', interested_in='Female')
+    dashboard_ids(main_module, me)
+    assert db.recommendations.find_one({'_id': main_module.ObjectId(me)})['dashboard_fallback']
+    assert stored_dashboard(main_module, db, me) == [other]
+
+    newcomer = make_user('newcomer', gender='Female', interested_in='Male')
+    add_profile(main_module, db, newcomer)
+
+    assert db.recommendations.find_one({'_id': main_module.ObjectId(me)}) is None
+    assert dashboard_ids(main_module, me) == [newcomer]
+
+
+def test_verified_registration_is_added_to_stored_lists(main_module, db, make_user, small_lists, monkeypatch):
+    monkeypatch.setattr(main_module, 'send_signup_confirmation_email', lambda *args: None)
+    me = make_user('viewer')
+    make_user('candidate', gender='Female', interested_in='Male')
+    dashboard_ids(main_module, me)
+
+    newcomer = make_user('newcomer', gender='Female', interested_in='Male', is_verified=False, otp='123456',
+                         otp_expires_at=main_module.datetime.now(main_module.timezone.utc) + main_module.timedelta(minutes=5))
+    response = main_module.app.test_client().post(f'/verify_otp/{newcomer}', data={'otp': '123456'})
+
+    assert response.status_code == 302
+    assert newcomer in stored_dashboard(main_module, db, me)
+
+
+def test_profile_edit_only_loads_owners_whose_pool_can_hold_it(main_module, db, make_user, small_lists, monkeypatch):
+    viewer = make_user('viewer')
+    rival = make_user('rival', gender='Female', interested_in='Male')
+    make_user('candidate', gender='Female', interested_in='Male')
+    for owner in (viewer, rival):
+        dashboard_ids(main_module, owner)
+    newcomer = make_user('newcomer', gender='Female', interested_in='Male')
+    loaded = []
+    find_users = db.users.find
+    monkeypatch.setattr(db.users, 'find', lambda *args, **kwargs: loaded.append(args[0]) or find_users(*args, **kwargs))
+
+    add_profile(main_module, db, newcomer)
+
+    # The rival prefers men, so their lists are neither read nor re-scored for her
+    owner_queries = [query for query in loaded if isinstance(query.get('_id'), dict)]
+    assert owner_queries == [{'_id': {'$in': [main_module.ObjectId(viewer)]}}]
+    assert newcomer in stored_dashboard(main_module, db, viewer)
+    assert newcomer not in stored_dashboard(main_module, db, rival)
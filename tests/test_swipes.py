@@ -0,0 +1,89 @@
+"""Tests for liking and skipping profiles in batches"""
+from bson import ObjectId
+
+
+def swipe(client, *decisions):
+    response = client.post('/swipe_batch', json={'decisions': [
+        {'user_id': user_id, 'action': action} for user_id, action in decisions
+    ]})
+    return response.get_json()
+
+
+def test_duplicate_and_invalid_decisions_are_rejected(db, make_user, login):
+    me = make_user('viewer')
+    other = make_user('other', gender='Female', interested_in='Male')
+
+    data = swipe(login('viewer'), (other, 'like'), (other, 'like'), (other, 'skip'), (me, 'like'),
+                 ('not-an-id', 'like'), (other, 'poke'))
+
+    assert [result['message'] for result in data['results']] == [
+        'Like sent successfully!', 'Duplicate decision!', 'Duplicate decision!', 'You cannot like yourself!',
+        'Invalid decision!', 'Invalid decision!'
+    ]
+    assert db.likes.count_documents({}) == 1
+    assert db.notifications.count_documents({'receiver_id': ObjectId(other)}) == 1
+    assert db.users.find_one({'_id': ObjectId(other)})['unread_notifications'] == 1
+
+
+def test_liking_twice_does_not_notify_again(db, make_user, login):
+    make_user('viewer')
+    other = make_user('other', gender='Female', interested_in='Male')
+    client = login('viewer')
+
+    swipe(client, (other, 'like'))
+    data = swipe(client, (other, 'like'))
+
+    assert not data['results'][0]['success']
+    assert data['results'][0]['message'] == 'You already liked this user!'
+    assert db.notifications.count_documents({}) == 1
+    assert db.users.find_one({'_id': ObjectId(other)})['unread_notifications'] == 1
+
+
+def test_like_stored_by_a_concurrent_request_counts_as_already_liked(db, make_user, login, monkeypatch):
+    me = make_user('viewer')
+    first, second = (make_user(name, gender='Female', interested_in='Male') for name in ('first', 'second'))
+    find_likes = db.likes.find
+
+    def find_then_race(*args, **kwargs):
+        # The other request stores its like right after this one checked for existing likes
+        likes = list(find_likes(*args, **kwargs))
+        if not db.likes.count_documents({'liked_id': ObjectId(first)}):
+            db.likes.insert_one({'liker_id': ObjectId(me), 'liked_id': ObjectId(first)})
+        return likes
+    monkeypatch.setattr(db.likes, 'find', find_then_race)
+
+    data = swipe(login('viewer'), (first, 'like'), (second, 'like'))
+
+    assert [result['message'] for result in data['results']] == ['You already liked this user!', 'Like sent successfully!']
+    assert db.likes.count_documents({'liker_id': ObjectId(me)}) == 2
+    assert [notif['receiver_id'] for notif in db.notifications.find()] == [ObjectId(second)]
+
+
+def test_mutual_like_creates_one_match(main_module, db, make_user, login):
+    me = make_user('viewer')
+    other = make_user('other', gender='Female', interested_in='Male')
+    swipe(login('other'), (me, 'like'))
+
+    data = swipe(login('viewer'), (other, 'like'))
+
+    assert data['matches'] == [other]
+    match = db.matches.find_one({'_id': main_module.match_pair_id(me, other)})
+    assert sorted(match['users']) == sorted([ObjectId(me), ObjectId(other)])
+    assert match['last_activity'] == match['created_at']
+    assert db.matches.count_documents({}) == 1
+
+
+def test_skips_leave_stored_recommendations(main_module, db, make_user, login):
+    me = make_user('viewer')
+    liked, skipped = (make_user(name, gender='Female', interested_in='Male') for name in ('liked', 'skipped'))
+    db.recommendations.insert_one({
+        '_id': ObjectId(me),
+        'dashboard': [{'user_id': ObjectId(liked)}, {'user_id': ObjectId(skipped)}],
+        'suggestions': [{'user_id': ObjectId(liked)}, {'user_id': ObjectId(skipped)}]
+    })
+
+    swipe(login('viewer'), (liked, 'like'), (skipped, 'skip'))
+
+    stored = db.recommendations.find_one({'_id': ObjectId(me)})
+    assert stored['dashboard'] == [{'user_id': ObjectId(liked)}]
+    assert stored['suggestions'] == []